@@ -0,0 +1,509 @@
+# -*- coding: utf-8 -*-
+"""benchmark.py
+
+This module is the shared benchmark suite of the data structures in this
+repository. the data structure modules don't import it, their comparisons
+are cases here, selected with --only
+
+every case is a (structure, operation) pair with a setup(size, rng) function,
+which builds the input (not timed) and returns the run() closure to time.
+setup is called again before every run, so a run may mutate its input
+
+for each size of the sweep, a case runs `warmup` times untimed, then `repeat`
+times timed with perf_counter_ns, then once more under tracemalloc for the
+peak memory allocated during the run.
+
+usage:
+    python benchmark.py --sizes 1000 10000 --repeat 5 --json result.json
+    python benchmark.py --only RedBlackTree SortedBlockMap/insert
+    python benchmark.py --only RecursiveRedBlackTree RedBlackTree
+    python benchmark.py --only BST RedBlackTree SortedBlockMap
+    python benchmark.py --only OddEvenJump --sizes 10000 100000 1000000
+    python benchmark.py --list
+
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# the modules import their neighbors flat, e.g. `import bst_utils`
+for directory in ('Trie', 'binaryTree', 'graph', 'multiwayTree', 'spacePartitioningTree'):
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+import ahocorasick
+import avlTree
+import BST
+import disjointSet
+import fenwickTree
+import nDimFenwickTree
+import oddEvenJump
+import redBlackTree
+import rope
+import segmentTree
+import slidingWindowCounter
+import sortedBlockMap
+import trie
+import ZDD
+
+
+class elapsed_time:
+    """context manager measuring the wall time of its block in nanoseconds"""
+    def __init__(self):
+        self.start = None
+        self.end = None
+        self.elapsed = None
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.end = time.perf_counter_ns()
+        self.elapsed = self.end - self.start
+
+
+CASES = []
+
+
+def case(structure, operation):
+    """register the decorated setup(size, rng) -> run as a case"""
+    def register(setup):
+        CASES.append((structure, operation, setup))
+        return setup
+    return register
+
+
+def measure(setup, size, repeat=5, warmup=1, seed=0):
+    """get the timings (ns) and the peak memory (bytes) of the case at size"""
+    for i in range(warmup):
+        setup(size, random.Random(seed + i))()
+
+    times = []
+    for i in range(repeat):
+        run = setup(size, random.Random(seed + i))
+        gc.collect()
+        with elapsed_time() as timer:
+            run()
+        times.append(timer.elapsed)
+
+    run = setup(size, random.Random(seed))
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return times, peak
+
+
+def run_suite(sizes, repeat=5, warmup=1, only=None, seed=0, report=print):
+    """
+    run every case (or the ones matching only, e.g. 'Rope' or 'Rope/index')
+    over sizes, and return the results as a list of dicts
+    """
+    results = []
+    for structure, operation, setup in CASES:
+        name = '{}/{}'.format(structure, operation)
+        if only and not any(pattern in (structure, name) for pattern in only):
+            continue
+        for size in sizes:
+            times, peak = measure(setup, size, repeat=repeat, warmup=warmup, seed=seed)
+            result = {
+                'structure': structure,
+                'operation': operation,
+                'size': size,
+                'repeat': repeat,
+                'warmup': warmup,
+                'times_ns': times,
+                'min_ns': min(times),
+                'median_ns': statistics.median(times),
+                'mean_ns': statistics.mean(times),
+                'peak_memory_bytes': peak,
+            }
+            results.append(result)
+            if report is not None:
+                report('{:<36} size={:<9} min {:>10.3f}ms  median {:>10.3f}ms  peak {:>9.1f}KB'.format(
+                    name, size, result['min_ns'] / 1e6, result['median_ns'] / 1e6, peak / 1024))
+    return results
+
+
+"""cases"""
+
+# not string.ascii_lowercase, the string/ directory of this repository shadows the module
+LOWERCASE = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def _words(rng, num, min_length=3, max_length=10, letters=LOWERCASE):
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(min_length, max_length)))
+            for _ in range(num)]
+
+
+def _shuffled(rng, size):
+    keys = list(range(size))
+    rng.shuffle(keys)
+    return keys
+
+
+def _intervals(rng, size):
+    intervals = []
+    for _ in range(size):
+        left, right = sorted([rng.randrange(10 * size), rng.randrange(10 * size)])
+        intervals.append(segmentTree.Interval(left, right, rng.random() < 0.5, rng.random() < 0.5))
+    return intervals
+
+
+def _family(rng, size):
+    """a family of size sets over 20 variables"""
+    return frozenset(frozenset(rng.sample(range(1, 21), rng.randint(1, 5))) for _ in range(size))
+
+
+@case('Trie', 'build')
+def trie_build(size, rng):
+    words = _words(rng, size)
+    return lambda: trie.Trie(words)
+
+
+@case('Trie', 'find')
+def trie_find(size, rng):
+    words = _words(rng, size)
+    tree = trie.Trie(words)
+    words += _words(rng, size)
+
+    def run():
+        for word in words:
+            tree.find(word)
+    return run
+
+
+@case('AhoCorasickTrie', 'build')
+def aho_corasick_build(size, rng):
+    patterns = _words(rng, size, letters='abcd')
+    return lambda: ahocorasick.AhoCorasickTrie.build_from(patterns)
+
+
+@case('AhoCorasickTrie', 'search')
+def aho_corasick_search(size, rng):
+    """search a text of 10 * size characters, the trie is kept in the class"""
+    ahocorasick.AhoCorasickTrie.build_from(_words(rng, size, letters='abcd'))
+    text = ''.join(rng.choice('abcd') for _ in range(10 * size))
+    return lambda: ahocorasick.AhoCorasickTrie.search_patterns_in(text)
+
+
+@case('DisjointSet', 'union_find')
+def disjoint_set_union_find(size, rng):
+    union_find = disjointSet.DisjointSet(range(size))
+    pairs = [(rng.randrange(size), rng.randrange(size)) for _ in range(size)]
+
+    def run():
+        for key1, key2 in pairs:
+            union_find.union(key1, key2)
+        for key1, key2 in pairs:
+            union_find.is_connected(key1, key2)
+    return run
+
+
+@case('FenwickTree', 'build')
+def fenwick_tree_build(size, rng):
+    values = [rng.randrange(1000) for _ in range(size)]
+    return lambda: fenwickTree.FenwickTree(values)
+
+
+@case('FenwickTree', 'update_prefix_sum')
+def fenwick_tree_update_prefix_sum(size, rng):
+    tree = fenwickTree.FenwickTree([rng.randrange(1000) for _ in range(size)])
+    indices = [rng.randrange(size) for _ in range(size)]
+
+    def run():
+        for idx in indices:
+            tree[idx] = idx
+            tree.prefix_sum(idx)
+    return run
+
+
+@case('BlockedFenwickTree', 'insert_delete')
+def blocked_fenwick_tree_insert_delete(size, rng):
+    tree = fenwickTree.BlockedFenwickTree([rng.randrange(1000) for _ in range(size)])
+    indices = [rng.randrange(size) for _ in range(size)]
+
+    def run():
+        for idx in indices:
+            tree.insert(idx, idx)
+        for idx in indices:
+            del tree[idx]
+    return run
+
+
+@case('BlockedFenwickTree', 'prefix_sum')
+def blocked_fenwick_tree_prefix_sum(size, rng):
+    tree = fenwickTree.BlockedFenwickTree([rng.randrange(1000) for _ in range(size)])
+    indices = [rng.randrange(size) for _ in range(size)]
+
+    def run():
+        for idx in indices:
+            tree.prefix_sum(idx)
+    return run
+
+
+@case('RangeFenwickTree', 'add_range_sum')
+def range_fenwick_tree_add_range_sum(size, rng):
+    tree = fenwickTree.RangeFenwickTree([rng.randrange(1000) for _ in range(size)])
+    ranges = [sorted([rng.randrange(size), rng.randrange(size)]) for _ in range(size)]
+
+    def run():
+        for start, end in ranges:
+            tree.add_range(start, end, 1)
+            tree.range_sum(start, end)
+    return run
+
+
+@case('NDimFenwickTree', 'add_box_sum')
+def n_dim_fenwick_tree_add_box_sum(size, rng):
+    """a square grid of about size cells"""
+    side = max(1, int(size ** 0.5))
+    tree = nDimFenwickTree.NDimFenwickTree((side, side))
+    boxes = []
+    for _ in range(size):
+        rows = sorted([rng.randrange(side), rng.randrange(side)])
+        columns = sorted([rng.randrange(side), rng.randrange(side)])
+        boxes.append(((rows[0], columns[0]), (rows[1], columns[1])))
+
+    def run():
+        for lower, upper in boxes:
+            tree.add(lower, 1)
+            tree.box_sum(lower, upper)
+    return run
+
+
+@case('SlidingWindowCounter', 'add_sum')
+def sliding_window_counter_add_sum(size, rng):
+    """an hour window of 1 second buckets, events up to 2 seconds apart"""
+    counter = slidingWindowCounter.SlidingWindowCounter(3600)
+    timestamps = []
+    now = 0.0
+    for _ in range(size):
+        now += 2 * rng.random()
+        timestamps.append(now)
+
+    def run():
+        for timestamp in timestamps:
+            counter.add(timestamp)
+            counter.sum(60)
+    return run
+
+
+def _insert_all(tree, keys):
+    def run():
+        for key in keys:
+            tree.insert(key, key)
+    return run
+
+
+def _ordered_map_cases(structure, tree_class, search_near):
+    """
+    register insert, search, search_near & delete of an ordered map, so the
+    maps compare side by side (the peak memory of insert is the built map).
+    the searches & deletions run on a map built by from_sorted
+    """
+    @case(structure, 'insert')
+    def insert(size, rng):
+        return _insert_all(tree_class(), _shuffled(rng, size))
+
+    @case(structure, 'search')
+    def search(size, rng):
+        tree = tree_class.from_sorted((key, key) for key in range(size))
+        keys = _shuffled(rng, size)
+
+        def run():
+            for key in keys:
+                tree.search(key)
+        return run
+
+    @case(structure, 'search_near')
+    def search_near_all(size, rng):
+        tree = tree_class.from_sorted((key, key) for key in range(size))
+        keys = _shuffled(rng, size)
+
+        def run():
+            for key in keys:
+                search_near(tree, key)
+        return run
+
+    @case(structure, 'delete')
+    def delete(size, rng):
+        tree = tree_class.from_sorted((key, key) for key in range(size))
+        keys = _shuffled(rng, size)
+
+        def run():
+            for key in keys:
+                tree.delete(key)
+        return run
+
+
+def _search_less_greater_near(tree, key):
+    tree.search_less_near(key)
+    tree.search_greater_near(key)
+
+
+def _floor_ceiling(tree, key):
+    """the nearest searches of BST include the key itself"""
+    tree.floor(key)
+    tree.ceiling(key)
+
+
+_ordered_map_cases('BST', BST.BST, _floor_ceiling)
+
+
+@case('AVLTree', 'insert')
+def avl_tree_insert(size, rng):
+    return _insert_all(avlTree.AVLTree(), _shuffled(rng, size))
+
+
+_ordered_map_cases('RecursiveRedBlackTree', redBlackTree.RecursiveRedBlackTree, _search_less_greater_near)
+_ordered_map_cases('RedBlackTree', redBlackTree.RedBlackTree, _search_less_greater_near)
+_ordered_map_cases('SortedBlockMap', sortedBlockMap.SortedBlockMap, _search_less_greater_near)
+
+
+@case('PersistentRedBlackTree', 'insert')
+def persistent_red_black_tree_insert(size, rng):
+    """every insertion makes a new version, the old ones are dropped"""
+    keys = _shuffled(rng, size)
+
+    def run():
+        tree = redBlackTree.PersistentRedBlackTree()
+        for key in keys:
+            tree = tree.insert(key, key)
+    return run
+
+
+@case('PersistentRedBlackTree', 'delete')
+def persistent_red_black_tree_delete(size, rng):
+    tree = redBlackTree.PersistentRedBlackTree.from_sorted((key, key) for key in range(size))
+    keys = _shuffled(rng, size)
+
+    def run():
+        version = tree
+        for key in keys:
+            version = version.delete(key)
+    return run
+
+
+def _text_leaves(rng, size, leaf_length=16):
+    text = ''.join(rng.choice('abcd') for _ in range(size))
+    return [text[start:start + leaf_length] for start in range(0, size, leaf_length)]
+
+
+@case('Rope', 'build')
+def rope_build(size, rng):
+    leaves = _text_leaves(rng, size)
+    return lambda: rope.Rope(leaves)
+
+
+@case('Rope', 'index')
+def rope_index(size, rng):
+    text = rope.Rope(_text_leaves(rng, size))
+    indices = [rng.randrange(size) for _ in range(size)]
+
+    def run():
+        for idx in indices:
+            text[idx]
+    return run
+
+
+@case('Rope', 'insert')
+def rope_insert(size, rng):
+    """100 insertions of 16 characters at random positions"""
+    text = rope.Rope(_text_leaves(rng, size))
+    indices = [rng.randrange(size) for _ in range(100)]
+
+    def run():
+        for idx in indices:
+            text.insert(idx, 'abcdabcdabcdabcd')
+    return run
+
+
+@case('SegmentTree', 'build')
+def segment_tree_build(size, rng):
+    intervals = _intervals(rng, size)
+    return lambda: segmentTree.SegmentTree(intervals)
+
+
+@case('SegmentTree', 'query')
+def segment_tree_query(size, rng):
+    tree = segmentTree.SegmentTree(_intervals(rng, size))
+    points = [rng.randrange(10 * size) for _ in range(size)]
+
+    def run():
+        for point in points:
+            tree.query(point)
+    return run
+
+
+@case('ZDD', 'from_set')
+def zdd_from_set(size, rng):
+    family = _family(rng, size)
+    return lambda: ZDD.ZDD().from_set(family)
+
+
+@case('ZDD', 'union_count')
+def zdd_union_count(size, rng):
+    zdd = ZDD.ZDD()
+    family1 = zdd.from_set(_family(rng, size))
+    family2 = zdd.from_set(_family(rng, size))
+    return lambda: zdd.count(zdd.union(family1, family2))
+
+
+@case('OddEvenJump', 'tree')
+def odd_even_jump_tree(size, rng):
+    A = _shuffled(rng, size)
+    return lambda: oddEvenJump.OddEvenJump(A, engine='tree').good_count()
+
+
+@case('OddEvenJump', 'stack')
+def odd_even_jump_stack(size, rng):
+    A = _shuffled(rng, size)
+    return lambda: oddEvenJump.OddEvenJump(A, engine='stack').good_count()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark the data structures of this repository')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', help='structures or structure/operation to run')
+    parser.add_argument('--json', help='write the results to this file as JSON')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for structure, operation, _ in CASES:
+            print('{}/{}'.format(structure, operation))
+        return
+
+    results = run_suite(args.sizes, repeat=args.repeat, warmup=args.warmup, only=args.only, seed=args.seed)
+    if args.json:
+        output = {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'sizes': args.sizes,
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'results': results,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,16 @@
 This module implements vanilla Binary Search Tree
 
 all of the operations(searching, inserting, deleting) takes O(h) time
+and they are loops instead of recursions, so skewed trees don't hit the
+recursion limit
 
 tree's height: ceil(log(N+1)) <= h <= N
 - best case: full binary tree
 - worst case: skewed binary tree
 
+each node also keeps the size of its subtree, which gives order statistics
+(rank, select) in O(h) time
+
 """
 
 import collections
@@ -22,15 +27,61 @@ class Node():
         self.value = value
         self.left = None
         self.right = None
+        self.size = 1  # number of nodes in the subtree
 
     def __repr__(self):
         return 'Node({},{})'.format(self.key, repr(self.value))
 
 
+def _size(node):
+    if node is None:
+        return 0
+    return node.size
+
+
 class BST(abc.MutableMapping):
-    def __init__(self, key, value):
-        self.root = Node(key, value)
-        self._len = 1  # the root
+    def __init__(self, key=None, value=None):
+        if key is None:
+            # empty tree
+            self.root = None
+            self._len = 0
+        else:
+            self.root = Node(key, value)
+            self._len = 1  # the root
+
+    @classmethod
+    def from_sorted(cls, items):
+        """
+        build a height-optimal tree from (key, value) pairs sorted by key in O(n) time
+        raises ValueError if the keys are not strictly increasing
+        """
+        bst = cls()
+        nodes = []
+        for key, value in items:
+            bst._key_check(key)
+            if nodes and not nodes[-1].key < key:
+                raise ValueError('keys must be strictly increasing: {} after {}'.format(key, nodes[-1].key))
+            nodes.append(Node(key, value))
+        bst.root = cls._build_balanced(nodes, 0, len(nodes))
+        bst._len = len(nodes)
+        return bst
+
+    def rebalance(self):
+        """rebuild the tree in place into a height-optimal one in O(n) time, reusing the nodes"""
+        nodes = list(bst_utils.iter_in_order(self.root))
+        self.root = self._build_balanced(nodes, 0, len(nodes))
+
+    @classmethod
+    def _build_balanced(cls, nodes, start, end):
+        """link nodes[start:end] (sorted) into a balanced subtree and return its root"""
+        if start >= end:
+            return None
+        mid = (start + end) // 2
+        node = nodes[mid]
+        node.left = cls._build_balanced(nodes, start, mid)
+        node.right = cls._build_balanced(nodes, mid + 1, end)
+        node.size = end - start
+        return node
 
     def _key_check(self, key):
         """ check key type and raise error if not valid"""
@@ -46,7 +97,7 @@ class BST(abc.MutableMapping):
 
     def __setitem__(self, key, value):
         self._key_check(key)
-        self._insert(self.root, key, value)
+        self.root = self._insert(self.root, key, value)
 
     def __delitem__(self, key):
         self._key_check(key)
@@ -54,6 +105,8 @@ class BST(abc.MutableMapping):
 
     def __iter__(self):
         """iterate over keys preorder"""
+        if self.root is None:
+            return
         iter_queue = collections.deque()
         iter_queue.append(self.root)
         while iter_queue:
@@ -67,36 +120,144 @@ class BST(abc.MutableMapping):
     def __len__(self):
         return self._len
 
+    def iter_sorted(self):
+        """iterate over keys in increasing order"""
+        for node in bst_utils.iter_in_order(self.root):
+            yield node.key
+
     def search(self, key):
         """get the value of a matched node"""
         return self._search(self.root, key)
 
     def _search(self, node, key):
+        node = self._search_node(node, key)
         if node is None:
             return None
-        if key < node.key:
-            return self._search(node.left, key)
-        elif key > node.key:
-            return self._search(node.right, key)
-        else:
-            return node.value
+        return node.value
+
+    def _search_node(self, node, key):
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return node
+        return None
+
+    def range(self, lo=None, hi=None):
+        """
+        lazily yield the nodes with lo <= key <= hi in increasing order
+        a missing bound is unbounded. subtrees out of the range are skipped,
+        so it takes O(h + k) time for k nodes and keeps an O(h) stack
+        """
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                if lo is not None and node.key < lo:
+                    # the node and its left subtree are below the range
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            else:
+                node = stack.pop()
+                if hi is not None and node.key > hi:
+                    return
+                yield node
+                node = node.right
+
+    def floor(self, key):
+        """get the node with the largest key <= key, or None"""
+        node = self.root
+        found = None
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                found = node
+                node = node.right
+            else:
+                return node
+        return found
+
+    def ceiling(self, key):
+        """get the node with the smallest key >= key, or None"""
+        node = self.root
+        found = None
+        while node is not None:
+            if key < node.key:
+                found = node
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return node
+        return found
+
+    def rank(self, key):
+        """get the number of keys smaller than key"""
+        node = self.root
+        rank = 0
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                rank += _size(node.left) + 1
+                node = node.right
+            else:
+                return rank + _size(node.left)
+        return rank
+
+    def select(self, k):
+        """get the node with the k-th smallest key (0-based)"""
+        if k < 0:
+            k += self._len
+        if not 0 <= k < _size(self.root):
+            raise IndexError('select index out of range')
+        node = self.root
+        while True:
+            left_size = _size(node.left)
+            if k < left_size:
+                node = node.left
+            elif k > left_size:
+                k -= left_size + 1
+                node = node.right
+            else:
+                return node
 
     def insert(self, key, value):
         """insert a new node, or update the value of existed node"""
         self.root = self._insert(self.root, key, value)
 
     def _insert(self, node, key, value):
+        """insert into the subtree of node and return the subtree's root"""
         if node is None:
             self._len += 1
             # make new node
             return Node(key, value)
-        if key < node.key:
-            node.left = self._insert(node.left, key, value)
-        elif key > node.key:
-            node.right = self._insert(node.right, key, value)
-        else:
-            node.value = value
-        return node
+        existing = self._search_node(node, key)
+        if existing is not None:
+            existing.value = value
+            return node
+
+        # the key is new, so every node on the way down gets one more descendant
+        self._len += 1
+        root = node
+        while True:
+            node.size += 1
+            if key < node.key:
+                if node.left is None:
+                    node.left = Node(key, value)
+                    break
+                node = node.left
+            else:
+                if node.right is None:
+                    node.right = Node(key, value)
+                    break
+                node = node.right
+        return root
 
     def min(self):
         """get a node which has the minimum key"""
@@ -105,25 +266,28 @@ class BST(abc.MutableMapping):
         return self._min(self.root)
 
     def _min(self, node):
-        if node.left is None:
-            return node
-        return self._min(node.left)
+        while node.left is not None:
+            node = node.left
+        return node
 
     def delete_min(self):
         """delete a node which has the minimum key"""
         if self.root is None:
             print("Empty Tree")
+            return
         self.root = self._delete_min(self.root)
 
     def _delete_min(self, node):
+        """delete the minimum of the subtree of node and return the subtree's root"""
+        self._len -= 1
         if node.left is None:
-            # last node
-            self._len -= 1
-            if node.right is None:
-                return None
-            else:
-                return node.right
-        node.left = self._delete_min(node.left)
+            return node.right
+        parent = node
+        parent.size -= 1
+        while parent.left.left is not None:
+            parent = parent.left
+            parent.size -= 1
+        parent.left = parent.left.right
         return node
 
     def delete(self, key):
@@ -135,25 +299,40 @@ class BST(abc.MutableMapping):
         case 1: target node has one child(left or right)
         case 2: target node has two children(left and right)
         """
-        if node is None:
-            return None
-        if key < node.key:
-            node.left = self._delete(node.left, key)
-        elif key > node.key:
-            node.right = self._delete(node.right, key)
-        else:
-            if node.right is None:
-                self._len -= 1
-                return node.left
-            elif node.left is None:
-                self._len -= 1
-                return node.right
+        target = self._search_node(node, key)
+        if target is None:
+            return node
+
+        # every node above the target loses one descendant
+        parent = None
+        current = node
+        while current is not target:
+            current.size -= 1
+            parent = current
+            if key < current.key:
+                current = current.left
             else:
-                target = node
-                node = self._min(target.right)
-                node.right = self._delete_min(target.right)
-                # _len decreased
-                node.left = target.left
+                current = current.right
+
+        if target.right is None:
+            self._len -= 1
+            replacement = target.left
+        elif target.left is None:
+            self._len -= 1
+            replacement = target.right
+        else:
+            replacement = self._min(target.right)
+            replacement.right = self._delete_min(target.right)
+            # _len decreased
+            replacement.left = target.left
+            replacement.size = target.size - 1
+
+        if parent is None:
+            return replacement
+        if parent.left is target:
+            parent.left = replacement
+        else:
+            parent.right = replacement
         return node
 
 
@@ -203,3 +382,35 @@ if __name__ == '__main__':
     print('size', len(bst))
     bst_utils.in_order(bst.root)
 
+    print()
+    print('----skewed tree----')
+    print()
+    bst = BST(0, 0)
+    for key in range(1, 5000):
+        bst[key] = key  # sorted keys make a linked list, deeper than the recursion limit
+    print('size', len(bst), 'min', next(bst_utils.iter_in_order(bst.root)))
+    print('post order starts with', next(bst_utils.iter_post_order(bst.root)))
+    del bst[4999]
+    print('after delete 4999, size', len(bst), 'search 4998', bst.search(4998))
+
+    print()
+    print('----ordered queries----')
+    print()
+    bst = BST(50, 'x')
+    for key in [20, 80, 10, 30, 70, 90, 25, 35]:
+        bst[key] = str(key)
+    print('keys between 22 and 72:', [node.key for node in bst.range(22, 72)])
+    print('floor(33):', bst.floor(33), 'ceiling(33):', bst.ceiling(33))
+    print('rank(70):', bst.rank(70), 'select(5):', bst.select(5))
+
+    print()
+    print('----balanced bulk load----')
+    print()
+    bst = BST.from_sorted((key, key * key) for key in range(100000))
+    print('size', len(bst), 'root', bst.root, 'select(12345)', bst.select(12345))
+    bst = BST(0, 0)
+    for key in range(1, 2000):
+        bst[key] = key
+    bst.rebalance()
+    print('rebalanced root', bst.root, 'root size', bst.root.size)
+
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""avlTree.py
+
+This module implements AVL Tree, a self-balancing Binary Search Tree
+
+each node stores the height of its subtree, and the heights of the two
+subtrees of any node differ by at most one. insertion & deletion restore
+this with at most O(h) rotations on the way back up.
+
+height of the AVL tree(N nodes) is smaller than 1.44log(N+2)
+so searching, inserting, deleting take O(log N) time, even for sorted inserts
+
+"""
+
+from collections import abc
+import bst_utils
+
+
+class Node():
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.left = None
+        self.right = None
+        self.height = 1
+
+    def __repr__(self):
+        return 'Node({},{},h={})'.format(self.key, repr(self.value), self.height)
+
+
+class AVLTree(abc.MutableMapping):
+    def __init__(self, key=None, value=None):
+        self.root = None
+        self._len = 0
+        if key is not None:
+            self.insert(key, value)
+
+    def __getitem__(self, key):
+        node = self._search_node(key)
+        if node is None:
+            raise KeyError(key)
+        return node.value
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        if self._search_node(key) is None:
+            raise KeyError(key)
+        self.delete(key)
+
+    def __iter__(self):
+        """iterate over keys in order"""
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                yield node.key
+                node = node.right
+
+    def __len__(self):
+        return self._len
+
+    def height(self, node):
+        if node is None:
+            return 0
+        return node.height
+
+    def _update_height(self, node):
+        left_height = self.height(node.left)
+        right_height = self.height(node.right)
+        if left_height > right_height:
+            node.height = left_height + 1
+        else:
+            node.height = right_height + 1
+
+    def balance_factor(self, node):
+        """height of the left subtree minus height of the right subtree"""
+        return self.height(node.left) - self.height(node.right)
+
+    def rotate_left(self, node):
+        """
+        move node.right up to the node's position, node becomes its left child
+        """
+        t = node.right
+        node.right = t.left
+        t.left = node
+        self._update_height(node)
+        self._update_height(t)
+        return t
+
+    def rotate_right(self, node):
+        """
+        move node.left up to the node's position, node becomes its right child
+        opposite case of rotate_left(node)
+        """
+        t = node.left
+        node.left = t.right
+        t.right = node
+        self._update_height(node)
+        self._update_height(t)
+        return t
+
+    def rebalance(self, node):
+        """
+        restore the AVL property of a node whose subtrees differ by at most 2
+        case LL: left-heavy, left child not right-heavy -> rotate_right
+        case LR: left-heavy, left child right-heavy -> rotate_left(left), rotate_right
+        case RR, RL: mirror cases
+        """
+        self._update_height(node)
+        balance = self.balance_factor(node)
+        if balance > 1:
+            if self.balance_factor(node.left) < 0:
+                node.left = self.rotate_left(node.left)
+            return self.rotate_right(node)
+        if balance < -1:
+            if self.balance_factor(node.right) > 0:
+                node.right = self.rotate_right(node.right)
+            return self.rotate_left(node)
+        return node
+
+    def search(self, key):
+        """get the value of a matched node"""
+        node = self._search_node(key)
+        if node is None:
+            return None
+        return node.value
+
+    def _search_node(self, key):
+        node = self.root
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return node
+        return None
+
+    def insert(self, key, value):
+        """insert a new node, or update the value of existed node"""
+        self.root = self._insert(self.root, key, value)
+
+    def _insert(self, node, key, value):
+        if node is None:
+            self._len += 1
+            return Node(key, value)
+        if key < node.key:
+            node.left = self._insert(node.left, key, value)
+        elif key > node.key:
+            node.right = self._insert(node.right, key, value)
+        else:
+            node.value = value
+            return node
+        return self.rebalance(node)
+
+    def min(self):
+        """get a node which has the minimum key"""
+        if self.root is None:
+            return None
+        return self._min(self.root)
+
+    def _min(self, node):
+        while node.left is not None:
+            node = node.left
+        return node
+
+    def delete_min(self):
+        """delete a node which has the minimum key"""
+        if self.root is None:
+            raise KeyError('delete_min from an empty tree')
+        self.root = self._delete_min(self.root)
+
+    def _delete_min(self, node):
+        if node.left is None:
+            self._len -= 1
+            return node.right
+        node.left = self._delete_min(node.left)
+        return self.rebalance(node)
+
+    def delete(self, key):
+        self.root = self._delete(self.root, key)
+
+    def _delete(self, node, key):
+        """
+        case 0: target node has no child
+        case 1: target node has one child(left or right)
+        case 2: target node has two children -> replace it with the minimum of the right subtree
+        """
+        if node is None:
+            return None
+        if key < node.key:
+            node.left = self._delete(node.left, key)
+        elif key > node.key:
+            node.right = self._delete(node.right, key)
+        else:
+            if node.right is None:
+                self._len -= 1
+                return node.left
+            elif node.left is None:
+                self._len -= 1
+                return node.right
+            else:
+                target = node
+                node = self._min(target.right)
+                node.right = self._delete_min(target.right)
+                # _len decreased
+                node.left = target.left
+        return self.rebalance(node)
+
+
+if __name__ == '__main__':
+    """test"""
+    avl = AVLTree()
+    for key, value in zip(range(1, 16), 'ABCDEFGHIJKLMNO'):
+        avl[key] = value  # sorted inserts stay balanced
+
+    print('after insertion')
+    print('size', len(avl), 'height', avl.height(avl.root))
+    bst_utils.print_tree(avl.root)
+
+    avl.delete_min()
+    print('after deleting min')
+    print('size', len(avl), 'min', avl.min())
+
+    del avl[8]
+    print('after delete 8')
+    print('size', len(avl), 'keys', list(avl))
+    bst_utils.print_tree(avl.root)
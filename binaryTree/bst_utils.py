@@ -5,35 +5,61 @@ This module implements common methods for visiting Binary Search Tree's nodes
 """
 
 
+def iter_in_order(node):
+    """yield nodes left -> root -> right, keeping only O(h) nodes on a stack"""
+    stack = []
+    while stack or node is not None:
+        if node is not None:
+            stack.append(node)
+            node = node.left
+        else:
+            node = stack.pop()
+            yield node
+            node = node.right
+
+def iter_pre_order(node):
+    """yield nodes root -> left -> right, keeping only O(h) nodes on a stack"""
+    stack = []
+    while stack or node is not None:
+        if node is not None:
+            yield node
+            if node.right is not None:
+                stack.append(node.right)
+            node = node.left
+        else:
+            node = stack.pop()
+
+def iter_post_order(node):
+    """yield nodes left -> right -> root, keeping only O(h) nodes on a stack"""
+    stack = []
+    last_visited = None
+    while stack or node is not None:
+        if node is not None:
+            stack.append(node)
+            node = node.left
+        else:
+            peek = stack[-1]
+            if peek.right is not None and last_visited is not peek.right:
+                node = peek.right
+            else:
+                last_visited = stack.pop()
+                yield last_visited
+
+def _visit(nodes, function):
+    for node in nodes:
+        if not function:
+            print(node)
+        else:
+            function(node)
+
 def in_order(node, function=None):
-    if node is None:
-        return
-    in_order(node.left, function=function)
-    if not function:
-        print(node)
-    else:
-        function(node)
-    in_order(node.right, function=function)
+    _visit(iter_in_order(node), function)
 
 def pre_order(node, function=None):
-    if node is None:
-        return
-    if not function:
-        print(node)
-    else:
-        function(node)
-    pre_order(node.left, function=function)
-    pre_order(node.right, function=function)
+    _visit(iter_pre_order(node), function)
 
 def post_order(node, function=None):
-    if node is None:
-        return
-    post_order(node.left, function=function)
-    post_order(node.right, function=function)
-    if not function:
-        print(node)
-    else:
-        function(node)
+    _visit(iter_post_order(node), function)
 
 def print_tree(root_node):
     try:
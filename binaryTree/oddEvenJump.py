@@ -6,16 +6,39 @@ https://leetcode.com/problems/odd-even-jump/
 Uses Left-Leaning Red-Black Tree (LLRB)
 Takes O(n log(n)) time
 
+engine='stack' computes the same jump tables without a tree: the indices are
+sorted by value, then a monotonic stack over that order finds the next jump
+of every index. the tables are flat arrays and the reachability is kept in
+bytearrays instead of sets, which handles arrays of 10^7 elements.
+Also takes O(n log(n)) time, for the sort
+
+time both engines with
+    python benchmark.py --only OddEvenJump --sizes 10000 100000 1000000
+
 """
 
-import random
-import time
+import array
 
 import redBlackTree
         
 
 class OddEvenJump():
-    def __init__(self, A):
+    def __init__(self, A, engine='tree'):
+        """
+        engine: 'tree' for the Red-Black Tree, 'stack' for the sort & monotonic stack
+        both give identical jump tables: the index to jump to, or the index itself
+        if there is nowhere to jump
+        """
+        if engine == 'tree':
+            self._build_with_tree(A)
+        elif engine == 'stack':
+            self._build_with_stack(A)
+        else:
+            raise ValueError('unknown engine {}'.format(engine))
+        self.engine = engine
+        self.A = A
+
+    def _build_with_tree(self, A):
         rbt = redBlackTree.RedBlackTree()
         
         keys = set()
@@ -55,11 +78,37 @@ class OddEvenJump():
             keys.add(key)
         self.odd_jump = odd_jump
         self.even_jump = even_jump
-        self.A = A
         #print(list(zip(range(len(A)), A, odd_jump)))
         #print(list(zip(range(len(A)), A, even_jump)))
 
+    def _build_with_stack(self, A):
+        length = len(A)
+        # no jump by default
+        self.odd_jump = array.array('q', range(length))
+        self.even_jump = array.array('q', range(length))
+        # sorted() is stable even with reverse=True, so equal values stay in index order
+        ascending = sorted(range(length), key=A.__getitem__)
+        self._fill_next_jump(ascending, self.odd_jump)
+        del ascending
+        descending = sorted(range(length), key=A.__getitem__, reverse=True)
+        self._fill_next_jump(descending, self.even_jump)
+
+    def _fill_next_jump(self, order, jump):
+        """
+        for each index in order, the next jump is the first index after it in order
+        which is also greater than it: pop the smaller indices waiting on the stack
+        """
+        stack = [len(order)]  # sentinel, greater than every index
+        push = stack.append
+        pop = stack.pop
+        for idx in order:
+            while stack[-1] < idx:
+                jump[pop()] = idx
+            push(idx)
+
     def good_count(self):
+        if self.engine == 'stack':
+            return self._good_count_flat()
         even_good = set()
         odd_good = set()
 
@@ -89,44 +138,28 @@ class OddEvenJump():
                 #print('add even good', idx)
         return len(odd_good)
 
+    def _good_count_flat(self):
+        """same as good_count, reachability is kept in bytearrays"""
+        length = len(self.A)
+        if length == 0:
+            return 0
+        odd_jump = self.odd_jump
+        even_jump = self.even_jump
+        odd_good = bytearray(length)
+        even_good = bytearray(length)
+        odd_good[-1] = even_good[-1] = 1
+        # a jump to the index itself is never good, its flags are still 0
+        for idx in range(length - 2, -1, -1):
+            odd_good[idx], even_good[idx] = even_good[odd_jump[idx]], odd_good[even_jump[idx]]
+        return odd_good.count(1)
 
-### Measure Time Complexity
 
-class elapsed_time:
-    def __init__(self):
-        self.start = None
-        self.end = None
-        self.elapsed = None
-        self.memo = ''
-        
-    def __enter__(self):
-        # set things up
-        self.start = time.time()
-        return self
-
-    def __exit__(self, type, value, traceback):
-        # tear things down
-        self.end = time.time()
-        self.elapsed = self.end - self.start
-        #print(self.end - self.start, 'time elapsed', self.memo)
-
-def time_complexity(A):
-    with elapsed_time() as timer:
-        timer.memo = str(len(A))
-        oej = OddEvenJump(A)
-        oej.good_count()
-        #odd_jump = get_jump(A, next_odd_jump)
-    elapsed = timer.elapsed
-    return elapsed
+def good_counts(arrays, engine='stack'):
+    """get the good_count of each array"""
+    return [OddEvenJump(A, engine=engine).good_count() for A in arrays]
 
-if __name__ == "__main__":
-    for p in range(1, 7):
-        time_list = []
-        length = 10**p
-        A = list(range(length))
-        random.shuffle(A)
-        for batch in range(10):
-            elapsed = time_complexity(A)
-            time_list.append(elapsed)
-        print('average {}s, length={}'.format(sum(time_list)/len(time_list), length))
 
+if __name__ == "__main__":
+    A = [5, 1, 3, 4, 2]
+    print(good_counts([[10, 13, 12, 14, 15], [2, 3, 1, 1, 4], A], engine='tree'),
+          good_counts([[10, 13, 12, 14, 15], [2, 3, 1, 1, 4], A], engine='stack'))
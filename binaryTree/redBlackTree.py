@@ -7,8 +7,26 @@ insertion & deletion takes only O(h) time
 height of the RBT(N nodes) is not bigger than 2logN
 - if there are no RED nodes in the tree, h = logN
 - if it has the maximum RED nodes, h <= 2logN
+
+RedBlackTree is a MutableMapping: keys are iterated in order, and the number
+of nodes is counted during insertion & deletion so len() takes O(1) time
+
+each node also keeps the size of its subtree, updated by the rotations and
+fix_up, which gives rank / select / count_range in O(log N) time
+
+from_sorted builds a valid tree from sorted keys in O(N) time, and join /
+split concatenate two trees or cut one at a key in O(log N) time
+
+insertion, deletion & searches walk the tree in loops instead of recursion,
+RecursiveRedBlackTree keeps the recursive version as a baseline, compare them with
+    python benchmark.py --only RecursiveRedBlackTree RedBlackTree
+
+PersistentRedBlackTree is an immutable version: insert & delete return a new
+tree sharing all the untouched nodes, so old versions work as snapshots
 """
 
+from collections import abc
+
 import bst_utils
 
 
@@ -24,6 +42,7 @@ class Node():
         self.color = color
         self.left = None
         self.right = None
+        self.size = 1  # number of nodes in the subtree
     
     def __repr__(self):
         color = 'RED'
@@ -32,17 +51,278 @@ class Node():
         return  'Node({},{},{})'.format(self.key, repr(self.value), color)
 		
 
-class RedBlackTree():
+class RedBlackTree(abc.MutableMapping):
     def __init__(self):
         self.root = None
-    
+        self._len = 0
+
+    def __getitem__(self, key):
+        node, _ = self._search_node(self.root, key)
+        if node is None:
+            raise KeyError(key)
+        return node.value
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def __iter__(self):
+        """iterate over keys in order"""
+        for node in bst_utils.iter_in_order(self.root):
+            yield node.key
+
+    def __reversed__(self):
+        """iterate over keys in reverse order"""
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.right
+            else:
+                node = stack.pop()
+                yield node.key
+                node = node.left
+
+    def __len__(self):
+        return self._len
+
     def is_empty(self):
         return self.root is None
+
+    @classmethod
+    def from_sorted(cls, items):
+        """
+        build a tree from (key, value) pairs sorted by key in O(N) time
+        raises ValueError if the keys are not strictly increasing
+        """
+        nodes = []
+        for key, value in items:
+            if nodes and not nodes[-1].key < key:
+                raise ValueError('keys must be strictly increasing: {} after {}'.format(key, nodes[-1].key))
+            nodes.append(Node(key, value, BLACK))
+        tree = cls()
+        # a 2-3 tree of black height h holds 2^h - 1 to 3^h - 1 keys
+        black_height = (len(nodes) + 1).bit_length() - 1
+        tree.root = tree._build(nodes, 0, len(nodes), black_height)
+        tree._len = len(nodes)
+        return tree
+
+    def _build(self, nodes, start, end, black_height):
+        """
+        link nodes[start:end] into a subtree with a black root and the given black height
+        each level is a 2-node (one black node) or, when the keys don't fit
+        in two subtrees, a 3-node (a black node with a red left child)
+        """
+        if black_height == 0:
+            return None
+        num = end - start
+        capacity = 3 ** (black_height - 1) - 1  # max keys of a child subtree
+        if num - 1 <= 2 * capacity:
+            mid = start + (num - 1) // 2
+            node = nodes[mid]
+            node.left = self._build(nodes, start, mid, black_height - 1)
+            node.right = self._build(nodes, mid + 1, end, black_height - 1)
+        else:
+            first = start + (num - 2) // 3
+            second = first + 1 + (end - first - 2) // 2
+            red_node = nodes[first]
+            red_node.color = RED
+            red_node.left = self._build(nodes, start, first, black_height - 1)
+            red_node.right = self._build(nodes, first + 1, second, black_height - 1)
+            self._update_size(red_node)
+            node = nodes[second]
+            node.left = red_node
+            node.right = self._build(nodes, second + 1, end, black_height - 1)
+        node.color = BLACK
+        self._update_size(node)
+        return node
+
+    @classmethod
+    def join(cls, left_tree, right_tree):
+        """
+        concatenate two trees into a new one in O(log N) time
+        every key of left_tree must be smaller than every key of right_tree,
+        both input trees are emptied since their nodes are reused
+        """
+        tree = cls()
+        if right_tree.root is None:
+            tree.root, tree._len = left_tree.root, left_tree._len
+        else:
+            middle = right_tree.minimum_node(right_tree.root)
+            if left_tree.root is not None:
+                maximum = left_tree.root
+                while maximum.right is not None:
+                    maximum = maximum.right
+                if not maximum.key < middle.key:
+                    raise ValueError('keys of left_tree must be smaller than keys of right_tree')
+            key, value = middle.key, middle.value
+            right_tree.delete_min()
+            left_height = tree._black_height(left_tree.root)
+            right_height = tree._black_height(right_tree.root)
+            tree.root, _ = tree._join_nodes(left_tree.root, left_height, Node(key, value, RED),
+                                            right_tree.root, right_height)
+            tree._len = left_tree._len + right_tree._len + 1
+        left_tree.root, left_tree._len = None, 0
+        right_tree.root, right_tree._len = None, 0
+        return tree
+
+    def split(self, key):
+        """
+        split into two new trees with keys < key and keys >= key in O(log N) time
+        this tree is emptied since its nodes are reused
+        """
+        left_root, _, right_root, _ = self._split(self.root, self._black_height(self.root), key)
+        left_tree = self.__class__()
+        left_tree.root, left_tree._len = left_root, self.size(left_root)
+        right_tree = self.__class__()
+        right_tree.root, right_tree._len = right_root, self.size(right_root)
+        self.root, self._len = None, 0
+        return left_tree, right_tree
+
+    def merge(self, other):
+        """
+        move every item of other into this tree, other's values win on equal keys
+        takes O(log N) time with join if the key ranges don't overlap,
+        otherwise O(N) time by merging the sorted items and rebuilding
+        other is emptied
+        """
+        if other.root is None:
+            return
+        if self.root is None:
+            self.root, self._len = other.root, other._len
+        elif self._max_key() < other.minimum_node(other.root).key:
+            joined = self.join(self, other)
+            self.root, self._len = joined.root, joined._len
+        elif other._max_key() < self.minimum_node(self.root).key:
+            joined = self.join(other, self)
+            self.root, self._len = joined.root, joined._len
+        else:
+            items = []
+            mine = bst_utils.iter_in_order(self.root)
+            theirs = bst_utils.iter_in_order(other.root)
+            node1 = next(mine, None)
+            node2 = next(theirs, None)
+            while node1 is not None or node2 is not None:
+                if node2 is None or (node1 is not None and node1.key < node2.key):
+                    items.append((node1.key, node1.value))
+                    node1 = next(mine, None)
+                else:
+                    if node1 is not None and node1.key == node2.key:
+                        node1 = next(mine, None)
+                    items.append((node2.key, node2.value))
+                    node2 = next(theirs, None)
+            rebuilt = self.from_sorted(items)
+            self.root, self._len = rebuilt.root, rebuilt._len
+        other.root, other._len = None, 0
+
+    def _max_key(self):
+        node = self.root
+        while node.right is not None:
+            node = node.right
+        return node.key
+
+    def _black_height(self, node):
+        """number of BLACK nodes on a path from node down to a leaf"""
+        height = 0
+        while node is not None:
+            if not self.is_red(node):
+                height += 1
+            node = node.left
+        return height
+
+    def _join_nodes(self, left, left_height, node, right, right_height):
+        """
+        join two subtrees and a node with a key between them
+        returns the new BLACK root and its black height
+        """
+        # a subtree used as a tree of its own gets a BLACK root
+        if self.is_red(left):
+            left.color = BLACK
+            left_height += 1
+        if self.is_red(right):
+            right.color = BLACK
+            right_height += 1
+
+        if left_height == right_height:
+            node.left = left
+            node.right = right
+            node.color = BLACK
+            self._update_size(node)
+            return node, left_height + 1
+        if left_height > right_height:
+            root = self._join_right(left, left_height, node, right, right_height)
+            height = left_height
+        else:
+            root = self._join_left(right, right_height, node, left, left_height)
+            height = right_height
+        if self.is_red(root):
+            root.color = BLACK
+            height += 1
+        return root, height
+
+    def _join_right(self, tree, height, node, right, right_height):
+        """
+        hang node (RED) with right as its right child on the right spine of tree,
+        where the black height equals right_height, and fix the tree up as in an insertion
+        """
+        if height == right_height and not self.is_red(tree):
+            node.left = tree
+            node.right = right
+            node.color = RED
+            self._update_size(node)
+            return node
+        if not self.is_red(tree):
+            height -= 1
+        tree.right = self._join_right(tree.right, height, node, right, right_height)
+        return self.fix_up(tree)
+
+    def _join_left(self, tree, height, node, left, left_height):
+        """mirror of _join_right on the left spine of tree"""
+        if height == left_height and not self.is_red(tree):
+            node.left = left
+            node.right = tree
+            node.color = RED
+            self._update_size(node)
+            return node
+        if not self.is_red(tree):
+            height -= 1
+        tree.left = self._join_left(tree.left, height, node, left, left_height)
+        return self.fix_up(tree)
+
+    def _split(self, node, height, key):
+        """
+        split the subtree of node (with the given black height) at key
+        returns the roots and black heights of the parts with keys < key and keys >= key
+        """
+        if node is None:
+            return None, 0, None, 0
+        child_height = height
+        if not self.is_red(node):
+            child_height -= 1
+        left, right = node.left, node.right
+        if key <= node.key:
+            left_root, left_height, right_root, right_height = self._split(left, child_height, key)
+            right_root, right_height = self._join_nodes(right_root, right_height, node, right, child_height)
+        else:
+            left_root, left_height, right_root, right_height = self._split(right, child_height, key)
+            left_root, left_height = self._join_nodes(left, child_height, node, left_root, left_height)
+        return left_root, left_height, right_root, right_height
     
     def is_red(self, node):
         if node is None:
             return False
         return node.color == RED
+
+    def size(self, node):
+        if node is None:
+            return 0
+        return node.size
+
+    def _update_size(self, node):
+        node.size = 1 + self.size(node.left) + self.size(node.right)
     
     def search(self, key):
         return self._search(self.root, key)
@@ -54,15 +334,109 @@ class RedBlackTree():
         else:
             return searched.value
 
-    def _search_node(self, node, key, parent=None):
-        if node is None:
-            return None, None
-        if key < node.key:
-            return self._search_node(node.left, key, parent=node)
-        elif key > node.key:
-            return self._search_node(node.right, key, parent=node)
+    def irange(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """
+        lazily yield the keys between lo and hi in order (reverse order if reverse)
+        a missing bound is unbounded, inclusive tells whether each bound is included.
+        subtrees out of the range are skipped, so it takes O(log N + k) time for k keys
+        """
+        include_lo, include_hi = inclusive
+
+        def below(key):
+            if lo is None:
+                return False
+            return key < lo or (key == lo and not include_lo)
+
+        def above(key):
+            if hi is None:
+                return False
+            return key > hi or (key == hi and not include_hi)
+
+        if reverse:
+            below, above = above, below
+            first, second = 'right', 'left'
         else:
-            return node, parent
+            first, second = 'left', 'right'
+
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                if below(node.key):
+                    # the node and its first-side subtree are out of the range
+                    node = getattr(node, second)
+                else:
+                    stack.append(node)
+                    node = getattr(node, first)
+            else:
+                node = stack.pop()
+                if above(node.key):
+                    return
+                yield node.key
+                node = getattr(node, second)
+
+    def bisect_left(self, key):
+        """get the position where key would be inserted before equal keys (number of keys < key)"""
+        return self.rank(key)
+
+    def bisect_right(self, key):
+        """get the position where key would be inserted after equal keys (number of keys <= key)"""
+        node = self.root
+        position = 0
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            else:
+                position += self.size(node.left) + 1
+                node = node.right
+        return position
+
+    def rank(self, key):
+        """get the number of keys smaller than key"""
+        node = self.root
+        rank = 0
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                rank += self.size(node.left) + 1
+                node = node.right
+            else:
+                return rank + self.size(node.left)
+        return rank
+
+    def select(self, k):
+        """get the node with the k-th smallest key (0-based, negative counts from the end)"""
+        if k < 0:
+            k += self._len
+        if not 0 <= k < self.size(self.root):
+            raise IndexError('select index out of range')
+        node = self.root
+        while True:
+            left_size = self.size(node.left)
+            if k < left_size:
+                node = node.left
+            elif k > left_size:
+                k -= left_size + 1
+                node = node.right
+            else:
+                return node
+
+    def count_range(self, lo, hi):
+        """get the number of keys with lo <= key <= hi"""
+        if hi < lo:
+            return 0
+        return self.bisect_right(hi) - self.rank(lo)
+
+    def _search_node(self, node, key, parent=None):
+        while node is not None:
+            if key < node.key:
+                parent, node = node, node.left
+            elif key > node.key:
+                parent, node = node, node.right
+            else:
+                return node, parent
+        return None, None
 
     def search_less_near(self, key):
         return self._search_less_near(self.root, key)
@@ -71,16 +445,14 @@ class RedBlackTree():
         """
         search for the node that has smaller and nearest key (not equal)
         """
-        if node is None:
-            return largest
-        elif key < node.key:
-            return self._search_less_near(node.left, key, largest=largest)
-        elif key > node.key:
-            if largest is None or largest.key < node.key:
-                largest = node
-            return self._search_less_near(node.right, key, largest=largest)
-        else:
-            return self._search_less_near(node.left, key, largest=largest)
+        while node is not None:
+            if key > node.key:
+                if largest is None or largest.key < node.key:
+                    largest = node
+                node = node.right
+            else:
+                node = node.left
+        return largest
 
     def search_greater_near(self, key):
         return self._search_greater_near(self.root, key)
@@ -89,16 +461,14 @@ class RedBlackTree():
         """
         search for the node that has greater and nearest key (not equal)
         """
-        if node is None:
-            return smallest
-        elif key < node.key:
-            if smallest is None or smallest.key > node.key:
-                smallest = node
-            return self._search_greater_near(node.left, key, smallest=smallest)
-        elif key > node.key:
-            return self._search_greater_near(node.right, key, smallest=smallest)
-        else:
-            return self._search_greater_near(node.right, key, smallest=smallest)
+        while node is not None:
+            if key < node.key:
+                if smallest is None or smallest.key > node.key:
+                    smallest = node
+                node = node.left
+            else:
+                node = node.right
+        return smallest
 
     def rotate_left(self, node):
         """
@@ -112,6 +482,8 @@ class RedBlackTree():
         t.left = node
         t.color = node.color
         node.color = RED
+        t.size = node.size
+        self._update_size(node)
         return t 
 
     def rotate_right(self, node):
@@ -124,6 +496,8 @@ class RedBlackTree():
         t.right = node
         t.color = node.color
         node.color = RED
+        t.size = node.size
+        self._update_size(node)
         return t
 
     def flip_colors(self, node):
@@ -136,33 +510,62 @@ class RedBlackTree():
         node.right.color = not node.right.color
 
     def insert(self, key, value):
-        self.root = self._insert(self.root, key, value)
-        self.root.color = BLACK
-
-    def _insert(self, node, key, value):
         """
-        insert a new node(RED)
+        insert a new node(RED), or update the value of existed node
+        the path from the root is kept on a list instead of the call stack,
+        then each node on it is balanced on the way back up
         case 0: right child is RED, left child is BLACK -> rotate_left
         case 1: left child is RED, left child's child is also RED -> rotate_right
         case 2: both two children are RED -> flip_colors
         """
-        if node is None:
-            return Node(key, value, RED)
-        if key < node.key:
-            node.left = self._insert(node.left, key, value)
-        elif key > node.key:
-            node.right = self._insert(node.right, key, value)
-        else:
-            node.value = value
-        
-        if (not self.is_red(node.left)) and self.is_red(node.right):
-            node = self.rotate_left(node)
-        if self.is_red(node.left) and self.is_red(node.left.left):
-            node = self.rotate_right(node)
-        if self.is_red(node.left) and self.is_red(node.right):
-            self.flip_colors(node)
-
-        return node
+        path = []  # (node, went_left) from the root down to the new node
+        node = self.root
+        while node is not None:
+            if key < node.key:
+                path.append((node, True))
+                node = node.left
+            elif key > node.key:
+                path.append((node, False))
+                node = node.right
+            else:
+                node.value = value
+                return
+        self._len += 1
+
+        node = Node(key, value, RED)
+        while path:
+            parent, went_left = path.pop()
+            if went_left:
+                parent.left = node
+            else:
+                parent.right = node
+            if node.color == BLACK:
+                # none of the cases can happen above a BLACK subtree root,
+                # the ancestors only grow by the new node
+                parent.size += 1
+                for ancestor, _ in path:
+                    ancestor.size += 1
+                return
+
+            # is_red() is inlined, this loop runs for every insertion
+            left, right = parent.left, parent.right
+            if right is not None and right.color and (left is None or not left.color):
+                parent = self.rotate_left(parent)
+                left, right = parent.left, parent.right
+            if left is not None and left.color and left.left is not None and left.left.color:
+                parent = self.rotate_right(parent)
+                left, right = parent.left, parent.right
+            if left is not None and left.color and right is not None and right.color:
+                self.flip_colors(parent)
+            size = 1
+            if left is not None:
+                size += left.size
+            if right is not None:
+                size += right.size
+            parent.size = size
+            node = parent
+        node.color = BLACK
+        self.root = node
 
     def move_red_left(self, node):
         """
@@ -189,65 +592,360 @@ class RedBlackTree():
 
     def minimum_node(self, node):
         """get the minimum key node from the subtree"""
-        if node.left is None:
-            return node
-        else:
-            return self.minimum_node(node.left)
+        while node.left is not None:
+            node = node.left
+        return node
 
     def delete_min(self):
         """delete a node which has the min key"""
-        self.root = self._delete_min(self.root)
+        if self.root is None:
+            raise KeyError('delete_min from an empty tree')
+        if (not self.is_red(self.root.left)) and (not self.is_red(self.root.right)):
+            self.root.color = RED
+        self._remove(None, minimum=True)
+
+    def fix_up(self, node):
+        """fix the structure of RBT after deleting a node"""
+        if self.is_red(node.right):
+            node = self.rotate_left(node)
+        if self.is_red(node.left) and self.is_red(node.left.left):
+            node = self.rotate_right(node)
+        if self.is_red(node.left) and self.is_red(node.right):
+            self.flip_colors(node)
+        self._update_size(node)
+        return node
+
+    def delete(self, key):
+        """delete the node with key, raises KeyError if there is no such node"""
+        # check first, the top-down restructuring below assumes the key exists
+        node, _ = self._search_node(self.root, key)
+        if node is None:
+            raise KeyError(key)
+        if (not self.is_red(self.root.left)) and (not self.is_red(self.root.right)):
+            self.root.color = RED
+        self._remove(key)
+
+    def _remove(self, key, minimum=False):
+        """
+        remove the node with key (or the minimum node) without recursion
+        on the way down, move_red_left / move_red_right keep the current node
+        out of a 2-node, and the path is kept on a list. on the way back up,
+        each node on the path is relinked to its new child and fixed up
+        """
+        path = []  # (node, went_left) from the root down to the removed node
+        node = self.root
+        # is_red() is inlined, these loops run for every deletion
+        while True:
+            if minimum or key < node.key:
+                left = node.left
+                if left is None:
+                    # the minimum node, a leaf in LLRB
+                    break
+                if not left.color and (left.left is None or not left.left.color):
+                    node = self.move_red_left(node)
+                path.append((node, True))
+                node = node.left
+            else:
+                left = node.left
+                if left is not None and left.color:
+                    node = self.rotate_right(node)
+                right = node.right
+                if right is None and key == node.key:
+                    break
+                if not right.color and (right.left is None or not right.left.color):
+                    node = self.move_red_right(node)
+                if key == node.key:
+                    # replace the key with the minimum of the right subtree,
+                    # and go on removing that minimum
+                    min_node = self.minimum_node(node.right)
+                    node.key = min_node.key
+                    node.value = min_node.value
+                    minimum = True
+                path.append((node, False))
+                node = node.right
+        self._len -= 1
+
+        node = None
+        while path:
+            parent, went_left = path.pop()
+            if went_left:
+                parent.left = node
+            else:
+                parent.right = node
+            # fix_up(parent)
+            left, right = parent.left, parent.right
+            if right is not None and right.color:
+                parent = self.rotate_left(parent)
+                left, right = parent.left, parent.right
+            if left is not None and left.color and left.left is not None and left.left.color:
+                parent = self.rotate_right(parent)
+                left, right = parent.left, parent.right
+            if left is not None and left.color and right is not None and right.color:
+                self.flip_colors(parent)
+            size = 1
+            if left is not None:
+                size += left.size
+            if right is not None:
+                size += right.size
+            parent.size = size
+            node = parent
+        self.root = node
+        if node is not None:
+            node.color = BLACK
+
+
+class RecursiveRedBlackTree(RedBlackTree):
+    """
+    the recursive insertion, deletion & search of RedBlackTree,
+    kept as the baseline of the RedBlackTree cases of benchmark.py
+    """
+    def insert(self, key, value):
+        self.root = self._insert(self.root, key, value)
         self.root.color = BLACK
 
+    def _insert(self, node, key, value):
+        if node is None:
+            self._len += 1
+            return Node(key, value, RED)
+        if key < node.key:
+            node.left = self._insert(node.left, key, value)
+        elif key > node.key:
+            node.right = self._insert(node.right, key, value)
+        else:
+            node.value = value
+
+        if (not self.is_red(node.left)) and self.is_red(node.right):
+            node = self.rotate_left(node)
+        if self.is_red(node.left) and self.is_red(node.left.left):
+            node = self.rotate_right(node)
+        if self.is_red(node.left) and self.is_red(node.right):
+            self.flip_colors(node)
+        self._update_size(node)
+        return node
+
+    def delete_min(self):
+        if self.root is None:
+            raise KeyError('delete_min from an empty tree')
+        if (not self.is_red(self.root.left)) and (not self.is_red(self.root.right)):
+            self.root.color = RED
+        self.root = self._delete_min(self.root)
+        if self.root is not None:
+            self.root.color = BLACK
+
     def _delete_min(self, node):
         if node.left is None:
+            self._len -= 1
             return None
         if (not self.is_red(node.left)) and (not self.is_red(node.left.left)):
             node = self.move_red_left(node)
         node.left = self._delete_min(node.left)
         return self.fix_up(node)
-    
-    def fix_up(self, node):
-        """fix the structure of RBT after deleting a node"""
-        if self.is_red(node.right):
+
+    def delete(self, key):
+        node, _ = self._search_node(self.root, key)
+        if node is None:
+            raise KeyError(key)
+        if (not self.is_red(self.root.left)) and (not self.is_red(self.root.right)):
+            self.root.color = RED
+        self.root = self._delete(self.root, key)
+        if self.root is not None:
+            self.root.color = BLACK
+
+    def _delete(self, node, key):
+        if key < node.key:
+            if (not self.is_red(node.left)) and (not self.is_red(node.left.left)):
+                node = self.move_red_left(node)
+            node.left = self._delete(node.left, key)
+        else:
+            if self.is_red(node.left):
+                node = self.rotate_right(node)
+            if key == node.key and node.right is None:
+                self._len -= 1
+                return None
+            if (not self.is_red(node.right)) and (not self.is_red(node.right.left)):
+                node = self.move_red_right(node)
+            if key == node.key:
+                min_node = self.minimum_node(node.right)
+                node.key = min_node.key
+                node.value = min_node.value
+                node.right = self._delete_min(node.right)
+            else:
+                node.right = self._delete(node.right, key)
+        return self.fix_up(node)
+
+    def _search_node(self, node, key, parent=None):
+        if node is None:
+            return None, None
+        if key < node.key:
+            return self._search_node(node.left, key, parent=node)
+        elif key > node.key:
+            return self._search_node(node.right, key, parent=node)
+        else:
+            return node, parent
+
+    def _search_less_near(self, node, key, largest=None):
+        if node is None:
+            return largest
+        elif key > node.key:
+            if largest is None or largest.key < node.key:
+                largest = node
+            return self._search_less_near(node.right, key, largest=largest)
+        else:
+            return self._search_less_near(node.left, key, largest=largest)
+
+    def _search_greater_near(self, node, key, smallest=None):
+        if node is None:
+            return smallest
+        elif key < node.key:
+            if smallest is None or smallest.key > node.key:
+                smallest = node
+            return self._search_greater_near(node.left, key, smallest=smallest)
+        else:
+            return self._search_greater_near(node.right, key, smallest=smallest)
+
+
+class PersistentRedBlackTree(RedBlackTree):
+    """
+    immutable RedBlackTree: insert, delete & delete_min return a new version
+    and leave this one as it was. only the O(log N) nodes on the changed path
+    are copied (path copying), the others are shared between the versions,
+    so a reader can keep querying an old version as a consistent snapshot
+    """
+    def __setitem__(self, key, value):
+        raise TypeError('PersistentRedBlackTree is immutable, insert() returns a new version')
+
+    def __delitem__(self, key):
+        raise TypeError('PersistentRedBlackTree is immutable, delete() returns a new version')
+
+    def split(self, key):
+        raise TypeError('PersistentRedBlackTree does not support split, it reuses the nodes')
+
+    def merge(self, other):
+        raise TypeError('PersistentRedBlackTree does not support merge, it reuses the nodes')
+
+    @classmethod
+    def join(cls, left_tree, right_tree):
+        raise TypeError('PersistentRedBlackTree does not support join, it reuses the nodes')
+
+    def _copy(self, node):
+        copied = Node(node.key, node.value, node.color)
+        copied.left = node.left
+        copied.right = node.right
+        copied.size = node.size
+        return copied
+
+    def _version(self, root, length):
+        version = self.__class__()
+        version.root = root
+        version._len = length
+        return version
+
+    """
+    the nodes passed to the methods below are already copies,
+    the children they change are copied here before changing them
+    """
+    def rotate_left(self, node):
+        node.right = self._copy(node.right)
+        return super().rotate_left(node)
+
+    def rotate_right(self, node):
+        node.left = self._copy(node.left)
+        return super().rotate_right(node)
+
+    def flip_colors(self, node):
+        node.left = self._copy(node.left)
+        node.right = self._copy(node.right)
+        super().flip_colors(node)
+
+    def insert(self, key, value):
+        """get a new version with key inserted, or with its value updated"""
+        version = self._version(None, self._len)
+        root = version._insert(self.root, key, value)
+        root.color = BLACK
+        version.root = root
+        return version
+
+    def _insert(self, node, key, value):
+        if node is None:
+            self._len += 1
+            return Node(key, value, RED)
+        node = self._copy(node)
+        if key < node.key:
+            node.left = self._insert(node.left, key, value)
+        elif key > node.key:
+            node.right = self._insert(node.right, key, value)
+        else:
+            node.value = value
+
+        if (not self.is_red(node.left)) and self.is_red(node.right):
             node = self.rotate_left(node)
         if self.is_red(node.left) and self.is_red(node.left.left):
             node = self.rotate_right(node)
         if self.is_red(node.left) and self.is_red(node.right):
             self.flip_colors(node)
+        self._update_size(node)
         return node
-    
+
+    def delete_min(self):
+        """get a new version without the min key"""
+        if self.root is None:
+            raise KeyError('delete_min from an empty tree')
+        version = self._version(None, self._len)
+        root = self._copy(self.root)
+        if (not self.is_red(root.left)) and (not self.is_red(root.right)):
+            root.color = RED
+        version.root = version._delete_min(root)
+        if version.root is not None:
+            version.root.color = BLACK
+        return version
+
+    def _delete_min(self, node):
+        if node.left is None:
+            self._len -= 1
+            return None
+        node = self._copy(node)
+        if (not self.is_red(node.left)) and (not self.is_red(node.left.left)):
+            node = self.move_red_left(node)
+        node.left = self._delete_min(node.left)
+        return self.fix_up(node)
+
     def delete(self, key):
-        self.root = self._delete(self.root, key)
+        """get a new version without key, raises KeyError if there is no such node"""
+        node, _ = self._search_node(self.root, key)
+        if node is None:
+            raise KeyError(key)
+        version = self._version(None, self._len)
+        root = self._copy(self.root)
+        if (not self.is_red(root.left)) and (not self.is_red(root.right)):
+            root.color = RED
+        version.root = version._delete(root, key)
+        if version.root is not None:
+            version.root.color = BLACK
+        return version
 
     def _delete(self, node, key):
+        node = self._copy(node)
         if key < node.key:
-            if node.left is None:
-                raise KeyError(key)
-            if not (self.is_red(node.left)) and (not self.is_red(node.left.left)):
+            if (not self.is_red(node.left)) and (not self.is_red(node.left.left)):
                 node = self.move_red_left(node)
             node.left = self._delete(node.left, key)
-            return node
         else:
             if self.is_red(node.left):
                 node = self.rotate_right(node)
             if key == node.key and node.right is None:
-                return node.left
-            elif node.right is None:
-                raise KeyError(key)
-            elif (not self.is_red(node.right)) and (not self.is_red(node.right.left)):
+                self._len -= 1
+                return None
+            if (not self.is_red(node.right)) and (not self.is_red(node.right.left)):
                 node = self.move_red_right(node)
-            
-            if key == node.key: # and node.right is not None:
-                # remove root
+            if key == node.key:
                 min_node = self.minimum_node(node.right)
                 node.key = min_node.key
                 node.value = min_node.value
                 node.right = self._delete_min(node.right)
             else:
                 node.right = self._delete(node.right, key)
-            return self.fix_up(node)
-        
+        return self.fix_up(node)
+
 
 if __name__ == '__main__':
     """test"""
@@ -272,10 +970,35 @@ if __name__ == '__main__':
     bst_utils.print_tree(rbt.root)
 
     print('delete 15')
-    rbt._delete(rbt.root, 15)
+    rbt.delete(15)
 
     print('after deletion')
     #bst_utils.pre_order(rbt.root)
     bst_utils.print_tree(rbt.root)
 
     print('abc', rbt.root.left.right)
+
+    print('sorted map')
+    rbt = RedBlackTree()
+    for key in [50, 20, 80, 10, 30, 70, 90, 25, 35]:
+        rbt[key] = str(key)
+    print('len', len(rbt), 'keys', list(rbt), 'reversed', list(reversed(rbt)))
+    print('keys in [22, 72):', list(rbt.irange(22, 72, inclusive=(True, False))))
+    print('bisect_left(30):', rbt.bisect_left(30), 'bisect_right(30):', rbt.bisect_right(30))
+    print('rank(70):', rbt.rank(70), 'select(-2):', rbt.select(-2), 'count_range(20, 50):', rbt.count_range(20, 50))
+
+    print('bulk build, split and join')
+    rbt = RedBlackTree.from_sorted((key, key * key) for key in range(100000))
+    print('len', len(rbt), 'root', rbt.root)
+    low, high = rbt.split(40000)
+    print('split at 40000:', len(low), len(high), 'max of low', low.select(-1))
+    rbt = RedBlackTree.join(low, high)
+    print('joined back:', len(rbt), 'rank(40000):', rbt.rank(40000))
+
+    print('persistent versions')
+    version1 = PersistentRedBlackTree.from_sorted((key, str(key)) for key in range(1000))
+    version2 = version1.insert(1000, '1000').delete(500)
+    print('version1:', len(version1), 500 in version1, 'version2:', len(version2), 500 in version2)
+    nodes1 = set(map(id, bst_utils.iter_in_order(version1.root)))
+    nodes2 = set(map(id, bst_utils.iter_in_order(version2.root)))
+    print('nodes shared by the versions:', len(nodes1 & nodes2))
@@ -2,16 +2,27 @@
 """rope.py
 This module implements the rope data structure as described in:
     https://en.wikipedia.org/wiki/Rope_(data_structure)
+
+short leaves: as in the paper, adjacent leaves are merged into one while the
+merged string is not longer than short_leaf_length. appending one character
+at a time then extends the last leaf instead of adding a leaf and a node
+per character
+
+AVL rope: each node keeps its height, and concatenation joins two trees like
+AVL trees, going down the spine of the higher one and rotating on the way
+back up. only the O(log n) nodes on that path are made anew, the others are
+shared. split cuts the tree along the path to an index with joins, so
+insert, delete, replace and sub_rope take O(log n) time instead of
+rebuilding the whole tree. the constructor and rebalance() build the tree
+with pairwise joins too, so join and split only ever see AVL trees. the
+depth bound of the paper (length >= Fibonacci(depth + 2)) holds for them, and
+checking it is only a safety net
 """
 
-# To Do: make delete / replace without rebalancing
-# To Do: implement "short" leaf nodes to append short strings to node.value : _concat_ndoes_short
 # To Do: make consistent the methods that return the new rope
 
 import bisect
-import collections
-import heapq
-import itertools
+import collections.abc
 import math
 
 
@@ -20,6 +31,7 @@ class Node():
         self.value = value
         self.left = None
         self.right = None
+        self.height = 0  # leaves are at height 0
         # self.length = len(value) # just call len(self.value)
         if value is not None:
             self.length_sum = len(value)
@@ -54,8 +66,19 @@ class Fibonacci():
 
 
 class Rope(collections.abc.MutableSequence):
-    def __init__(self, strings=None):
+    SHORT_LEAF_LENGTH = 32  # default short_leaf_length
+
+    def __init__(self, strings=None, short_leaf_length=None):
+        """
+        strings: a string or a list of strings for the leaves
+        short_leaf_length: leaves are merged while they are not longer than this,
+                           0 to keep every leaf as it is
+        """
         self.root = None
+        if short_leaf_length is None:
+            short_leaf_length = self.SHORT_LEAF_LENGTH
+        self.short_leaf_length = short_leaf_length
+        self._fibonacci = Fibonacci()
         if strings is not None:
             if isinstance(strings, str):
                 strings = [strings]
@@ -93,6 +116,8 @@ class Rope(collections.abc.MutableSequence):
             raise TypeError("index must be int or slice")
 
     def __len__(self):
+        if self.root is None:
+            return 0
         return self.root.length_sum
 
     def __setitem__(self, idx, val):
@@ -120,7 +145,6 @@ class Rope(collections.abc.MutableSequence):
                 error_message = "attempt to assign sequence of size {}".format(len(val))
                 error_message += " to extended slice of size {}".format(indices_length)
                 raise ValueError(error_message)
-            # To Do: takes too much time rebalancing
             for i, v in zip(range(start, stop, step), val):
                 self.__setitem__(i, v)
 
@@ -144,7 +168,6 @@ class Rope(collections.abc.MutableSequence):
         if step == 1:
             self.delete(start, stop)
         else:
-            # To Do: takes too much time rebalancing
             for i in range(start, stop, step):
                 self.delete(i, i+1)
 
@@ -181,43 +204,173 @@ class Rope(collections.abc.MutableSequence):
         root.left = left_node
         root.right = right_node
         root.length_sum = left_node.length_sum + right_node.length_sum
+        root.height = max(left_node.height, right_node.height) + 1
         return root
 
     @classmethod
-    def _concat_nodes_short(cls, left_node, right_node):
+    def _concat_nodes_short(cls, left_node, right_node, short_leaf_length=None):
         """
         concatenate two nodes and return a new root node
         as in the paper, concatenate the strings if:
         a) both nodes are short leaves
         or
         b) the right most son of left_node and the right_node are short leaves
+        (or the mirror case of b, for prepending)
+        the nodes may be shared with other ropes, so new nodes are made instead of changing them
         """
-        raise NotImplementedError('short leaf not implemented')
-        root = Node()
-        root.left = left_node
-        root.right = right_node
-        root.length_sum = left_node.length_sum + right_node.length_sum
-        return root
+        if short_leaf_length is None:
+            short_leaf_length = cls.SHORT_LEAF_LENGTH
+        left_is_leaf = left_node.left is None and left_node.right is None
+        right_is_leaf = right_node.left is None and right_node.right is None
+        if left_is_leaf and right_is_leaf:
+            if left_node.length_sum + right_node.length_sum <= short_leaf_length:
+                return Node(left_node.value + right_node.value)
+        elif right_is_leaf:
+            son = left_node.right
+            if son.left is None and son.right is None \
+                    and son.length_sum + right_node.length_sum <= short_leaf_length:
+                return cls._concat_nodes(left_node.left, Node(son.value + right_node.value))
+        elif left_is_leaf:
+            son = right_node.left
+            if son.left is None and son.right is None \
+                    and left_node.length_sum + son.length_sum <= short_leaf_length:
+                return cls._concat_nodes(Node(left_node.value + son.value), right_node.right)
+        return cls._concat_nodes(left_node, right_node)
+
+    def _coalesce_leaves(self, leaves):
+        """
+        merge runs of adjacent short leaves into leaves of at most short_leaf_length,
+        longer leaves are yielded as they are, and empty leaves are dropped
+        """
+        short_leaf_length = self.short_leaf_length
+        pieces = []
+        pieces_length = 0
+        for leaf in leaves:
+            length = leaf.length_sum
+            if length == 0:
+                continue
+            if pieces and pieces_length + length > short_leaf_length:
+                yield pieces[0] if len(pieces) == 1 else Node(''.join(piece.value for piece in pieces))
+                pieces = []
+                pieces_length = 0
+            if length > short_leaf_length:
+                yield leaf
+            else:
+                pieces.append(leaf)
+                pieces_length += length
+        if pieces:
+            yield pieces[0] if len(pieces) == 1 else Node(''.join(piece.value for piece in pieces))
 
     @classmethod
     def concat(cls, left_rope, right_rope):
         """
-        Concatnate two ropes and return a new rope with O(1) time complexity.
+        Concatnate two ropes and return a new rope with O(log n) time complexity.
         Instead of re-calculating sum of left subtree's length like wikipedia,
         store the length sum of the whole subtree for each node.
-        This makes 
+        both ropes are left as they are, the new rope shares their nodes
         """
-        new_rope = cls()
-        new_rope.root = cls._concat_nodes(left_rope.root, right_rope.root)
+        new_rope = cls(short_leaf_length=left_rope.short_leaf_length)
+        new_rope.root = new_rope._join(left_rope.root, right_rope.root)
+        new_rope._check_depth()
         return new_rope
     
     def append(self, right_rope):
         """ append a rope in place """
-        self.root = self._concat_nodes(self.root, right_rope.root)
+        self.root = self._join(self.root, right_rope.root)
+        self._check_depth()
 
     def append_left(self, left_rope):
         """ preppend a rope in place """
-        self.root = self._concat_nodes(left_rope.root, self.root)
+        self.root = self._join(left_rope.root, self.root)
+        self._check_depth()
+
+    def _height(self, node):
+        if node is None:
+            return -1
+        return node.height
+
+    def _join(self, left_node, right_node):
+        """
+        concatenate two subtrees into a balanced one and return the new root
+        go down the right spine of the higher left_node (or the left spine of
+        the higher right_node) to the subtree as high as the other one,
+        concatenate them there (merging short leaves), and rebalance the new
+        nodes on the way back up. takes O(|difference of the heights| + 1) time
+        None or an empty leaf stands for an empty subtree
+        """
+        if left_node is None or left_node.length_sum == 0:
+            return right_node
+        if right_node is None or right_node.length_sum == 0:
+            return left_node
+        if left_node.height > right_node.height + 1:
+            joined = self._join(left_node.right, right_node)
+            return self._balance(self._concat_nodes(left_node.left, joined))
+        if right_node.height > left_node.height + 1:
+            joined = self._join(left_node, right_node.left)
+            return self._balance(self._concat_nodes(joined, right_node.right))
+        return self._concat_nodes_short(left_node, right_node,
+                                        short_leaf_length=self.short_leaf_length)
+
+    def _balance(self, node):
+        """
+        restore the AVL property of a new node whose subtrees' heights differ by at most 2
+        the rotations make new nodes, since the children may be shared with other ropes
+        """
+        balance = self._height(node.left) - self._height(node.right)
+        if balance > 1:
+            left = node.left
+            if self._height(left.left) < self._height(left.right):
+                node = self._concat_nodes(self._rotate_left(left), node.right)
+            return self._rotate_right(node)
+        if balance < -1:
+            right = node.right
+            if self._height(right.right) < self._height(right.left):
+                node = self._concat_nodes(node.left, self._rotate_right(right))
+            return self._rotate_left(node)
+        return node
+
+    def _rotate_left(self, node):
+        """ move node.right up to the node's position, returns a new subtree """
+        right = node.right
+        return self._concat_nodes(self._concat_nodes(node.left, right.left), right.right)
+
+    def _rotate_right(self, node):
+        """ move node.left up to the node's position, returns a new subtree """
+        left = node.left
+        return self._concat_nodes(left.left, self._concat_nodes(left.right, node.right))
+
+    def _split(self, node, idx):
+        """
+        split the subtree of node into the subtrees of [:idx] and [idx:]
+        (None for an empty one) in O(log n) time: the subtrees hanging off
+        the path to idx are joined on each side
+        """
+        if node is None or idx <= 0:
+            return None, node
+        if idx >= node.length_sum:
+            return node, None
+        if node.left is None and node.right is None:
+            return Node(node.value[:idx]), Node(node.value[idx:])
+        weight = node.left.length_sum
+        if idx < weight:
+            left, right = self._split(node.left, idx)
+            return left, self._join(right, node.right)
+        elif idx > weight:
+            left, right = self._split(node.right, idx - weight)
+            return self._join(node.left, left), right
+        else:
+            return node.left, node.right
+
+    def _check_depth(self):
+        """
+        rebalance the whole tree if its depth exceeds the bound of the paper:
+        a balanced rope of depth n is at least Fibonacci(n + 2) long
+        """
+        root = self.root
+        if root is None or root.height == 0:
+            return
+        if root.length_sum < self._fibonacci.get(root.height):
+            self.rebalance()
     
     def _split_node(self, node, idx):
         """
@@ -322,17 +475,21 @@ class Rope(collections.abc.MutableSequence):
             raise IndexError(start_idx)
         elif end_idx > self.root.length_sum:
             raise IndexError(end_idx)
-        leaves = self._sub_leaves(self.root, start_idx, end_idx)
-        new_rope = self.__class__()
-        new_root = self._rebalance(leaves=leaves)
-        new_rope.root = new_root
+        _, right = self._split(self.root, start_idx)
+        middle, _ = self._split(right, end_idx - start_idx)
+        return self._new_rope(middle)
+
+    def _new_rope(self, root):
+        new_rope = self.__class__(short_leaf_length=self.short_leaf_length)
+        if root is None:
+            root = Node('')
+        new_rope.root = root
         return new_rope
     
     def split(self, idx):
         """ split the rope into two new ropes """
-        left_rope = self.sub_rope(0, idx)
-        right_rope = self.sub_rope(idx, self.root.length_sum)
-        return left_rope, right_rope
+        left, right = self._split(self.root, idx)
+        return self._new_rope(left), self._new_rope(right)
     
     def insert(self, idx, string):
         """ insert string at position idx, returns None """
@@ -340,18 +497,17 @@ class Rope(collections.abc.MutableSequence):
 
     def delete(self, i, j):
         """ delete [i:j] entries of rope, returns None """
-        left_leaves = self._sub_leaves(self.root, 0, i)
-        right_leaves = self._sub_leaves(self.root, j, self.root.length_sum)
-        leaves = itertools.chain(left_leaves, right_leaves)
-        self.rebalance(leaves=leaves)
+        self.replace(i, j, '')
 
     def replace(self, i, j, string):
-        """ replace [i:j] to string, returns None """
-        left_leaves = self._sub_leaves(self.root, 0, i)
-        middle_leaf = Node(string)
-        right_leaves = self._sub_leaves(self.root, j, self.root.length_sum)
-        leaves = itertools.chain(left_leaves, [middle_leaf], right_leaves)
-        self.rebalance(leaves=leaves)
+        """ replace [i:j] to string in O(log n) time, returns None """
+        left, right = self._split(self.root, i)
+        _, right = self._split(right, j - i)
+        root = self._join(self._join(left, Node(string)), right)
+        if root is None:
+            root = Node('')
+        self.root = root
+        self._check_depth()
 
     def build(self, leaves=None):
         """ build a balanced tree from a list of nodes and replace the original root """
@@ -407,43 +563,22 @@ class Rope(collections.abc.MutableSequence):
 
     def _rebalance(self, leaves=None):
         """
-        rebalance the tree from a list of nodes as described in:
-        Ropes: an Alternative to Strings, hans-j. boehm, russ atkinson and michael plass, 1995
-        and return the new root node
+        build a height-balanced (AVL) tree from a list of nodes and return the
+        new root node: short leaves are coalesced, then neighboring subtrees
+        are joined pairwise, level by level, in O(n) time
         """
-        fib = Fibonacci()
-        h = [] # heap
-        pos2node = dict()
-
         if leaves is None:
-            nodes = self._traverse(self.root) # generator
-        else:
-            nodes = leaves
-
-        def fibo_add(node):
-            pos = fib.find_index(node.length_sum)
-            if not h or h[0] > pos:
-                heapq.heappush(h, pos)
-                pos2node[pos] = node
-            else:
-                pos = heapq.heappop(h)
-                old_node = pos2node[pos]
-                concat_node = self._concat_nodes(old_node, node)
-                del pos2node[pos]
-                fibo_add(concat_node)
-
-        for node in nodes:
-            fibo_add(node)
-
-        right_pos = heapq.heappop(h)
-        right_node = pos2node[right_pos]
-        del pos2node[right_pos]
-        while len(h) >= 1:
-            left_pos = heapq.heappop(h)
-            left_node = pos2node[left_pos]
-            right_node = self._concat_nodes(left_node, right_node)
-            del pos2node[left_pos]
-        return right_node
+            leaves = self._traverse(self.root) # generator
+        level = list(self._coalesce_leaves(leaves))
+        if not level:
+            # every leaf was empty
+            return Node('')
+        while len(level) > 1:
+            joined = [self._join(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2 == 1:
+                joined[-1] = self._join(joined[-1], level[-1])
+            level = joined
+        return level[0]
 
     def rebalance(self, leaves=None):
         """ rebalance the rope with the given leaf nodes and replace the root """
@@ -482,6 +617,11 @@ def example():
 
     rope3[::-1] = 'HELLO WORLD MY NAME IS OOMNIW'  # __setitem__
     print(rope3)
+
+    typed = Rope('')
+    for char in 'typing one character at a time':
+        typed.append(Rope(char))  # short leaves are merged
+    print(typed, [leaf.value for leaf in typed._traverse(typed.root)])
     
     
     import time
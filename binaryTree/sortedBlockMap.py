@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""sortedBlockMap.py
+
+This module implements an ordered map as a list of sorted blocks
+(like a B+ tree of height 2, or sortedcontainers' SortedDict)
+
+keys are kept in sorted Python lists ("blocks") of about `load` keys, values in
+parallel lists, and the last key of each block in `_maxes`. an operation
+bisects `_maxes` to find the block, then bisects inside the block.
+- searching, nearest searches: O(log N)
+- inserting, deleting: O(log N + load) for moving the keys inside a block,
+  which is done by memmove in C and is much cheaper than allocating a node
+- rank, select: O(N / load + log N)
+
+a block is split in half when it grows beyond 2 * load keys, and merged with
+its neighbor when it shrinks below load / 2 keys.
+
+there is no node object per key, so it takes a fraction of the memory of
+RedBlackTree or BST, and scans read contiguous lists.
+It has the same search, nearest search & delete surface as RedBlackTree
+(nodes are returned as Item(key, value)), compare them with
+    python benchmark.py --only BST RedBlackTree SortedBlockMap
+
+"""
+
+from collections import abc
+import bisect
+import collections
+
+
+Item = collections.namedtuple('Item', ['key', 'value'])
+
+
+class SortedBlockMap(abc.MutableMapping):
+    def __init__(self, load=1000):
+        if load < 2:
+            raise ValueError('load must be at least 2')
+        self.load = load
+        self._keys = []    # sorted blocks of keys
+        self._values = []  # blocks of values, parallel to _keys
+        self._maxes = []   # the last key of each block
+        self._len = 0
+
+    def __repr__(self):
+        return 'SortedBlockMap(len={}, blocks={}, load={})'.format(self._len, len(self._keys), self.load)
+
+    def __getitem__(self, key):
+        i = bisect.bisect_left(self._maxes, key)
+        if i < len(self._maxes):
+            keys = self._keys[i]
+            j = bisect.bisect_left(keys, key)
+            if keys[j] == key:
+                return self._values[i][j]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def __iter__(self):
+        """iterate over keys in order"""
+        for keys in self._keys:
+            yield from keys
+
+    def __reversed__(self):
+        """iterate over keys in reverse order"""
+        for keys in reversed(self._keys):
+            yield from reversed(keys)
+
+    def __len__(self):
+        return self._len
+
+    def is_empty(self):
+        return self._len == 0
+
+    @classmethod
+    def from_sorted(cls, items, load=1000):
+        """
+        build a map from (key, value) pairs sorted by key in O(N) time
+        raises ValueError if the keys are not strictly increasing
+        """
+        tree = cls(load=load)
+        keys = []
+        values = []
+        for key, value in items:
+            if keys and not keys[-1] < key:
+                raise ValueError('keys must be strictly increasing: {} after {}'.format(key, keys[-1]))
+            keys.append(key)
+            values.append(value)
+        for start in range(0, len(keys), load):
+            tree._keys.append(keys[start:start + load])
+            tree._values.append(values[start:start + load])
+            tree._maxes.append(tree._keys[-1][-1])
+        tree._len = len(keys)
+        return tree
+
+    def search(self, key):
+        """get the value of key, None if there is no such key"""
+        i = bisect.bisect_left(self._maxes, key)
+        if i < len(self._maxes):
+            keys = self._keys[i]
+            j = bisect.bisect_left(keys, key)
+            if keys[j] == key:
+                return self._values[i][j]
+        return None
+
+    def search_less_near(self, key):
+        """search for the item that has smaller and nearest key (not equal)"""
+        i = bisect.bisect_left(self._maxes, key)
+        if i < len(self._maxes):
+            j = bisect.bisect_left(self._keys[i], key)
+            if j > 0:
+                return Item(self._keys[i][j - 1], self._values[i][j - 1])
+        if i == 0:
+            return None
+        return Item(self._keys[i - 1][-1], self._values[i - 1][-1])
+
+    def search_greater_near(self, key):
+        """search for the item that has greater and nearest key (not equal)"""
+        i = bisect.bisect_right(self._maxes, key)
+        if i == len(self._maxes):
+            return None
+        j = bisect.bisect_right(self._keys[i], key)
+        return Item(self._keys[i][j], self._values[i][j])
+
+    def min(self):
+        """get the item which has the minimum key"""
+        if not self._keys:
+            return None
+        return Item(self._keys[0][0], self._values[0][0])
+
+    def max(self):
+        """get the item which has the maximum key"""
+        if not self._keys:
+            return None
+        return Item(self._keys[-1][-1], self._values[-1][-1])
+
+    def insert(self, key, value):
+        """insert a new key, or update the value of existed key"""
+        maxes = self._maxes
+        if not maxes:
+            self._keys.append([key])
+            self._values.append([value])
+            maxes.append(key)
+            self._len = 1
+            return
+        i = bisect.bisect_left(maxes, key)
+        if i == len(maxes):
+            # greater than every key, append to the last block
+            i -= 1
+            self._keys[i].append(key)
+            self._values[i].append(value)
+            maxes[i] = key
+        else:
+            keys = self._keys[i]
+            j = bisect.bisect_left(keys, key)
+            if keys[j] == key:
+                self._values[i][j] = value
+                return
+            keys.insert(j, key)
+            self._values[i].insert(j, value)
+        self._len += 1
+        if len(self._keys[i]) > 2 * self.load:
+            self._split(i)
+
+    def delete(self, key):
+        """delete key, raises KeyError if there is no such key"""
+        i = bisect.bisect_left(self._maxes, key)
+        if i < len(self._maxes):
+            keys = self._keys[i]
+            j = bisect.bisect_left(keys, key)
+            if keys[j] == key:
+                self._delete_at(i, j)
+                return
+        raise KeyError(key)
+
+    def delete_min(self):
+        """delete the item which has the min key"""
+        if not self._keys:
+            raise KeyError('delete_min from an empty map')
+        self._delete_at(0, 0)
+
+    def _delete_at(self, i, j):
+        keys = self._keys[i]
+        del keys[j]
+        del self._values[i][j]
+        self._len -= 1
+        if not keys:
+            del self._keys[i]
+            del self._values[i]
+            del self._maxes[i]
+            return
+        self._maxes[i] = keys[-1]
+        if len(keys) < self.load // 2 and len(self._keys) > 1:
+            self._merge(i)
+
+    def _split(self, i):
+        """split the block i in half"""
+        keys = self._keys[i]
+        values = self._values[i]
+        half = len(keys) // 2
+        self._keys.insert(i + 1, keys[half:])
+        self._values.insert(i + 1, values[half:])
+        del keys[half:]
+        del values[half:]
+        self._maxes.insert(i, keys[-1])
+
+    def _merge(self, i):
+        """merge the small block i into its neighbor, and split again if it's too big"""
+        if i == len(self._keys) - 1:
+            i -= 1
+        self._keys[i].extend(self._keys[i + 1])
+        self._values[i].extend(self._values[i + 1])
+        self._maxes[i] = self._maxes[i + 1]
+        del self._keys[i + 1]
+        del self._values[i + 1]
+        del self._maxes[i + 1]
+        if len(self._keys[i]) > 2 * self.load:
+            self._split(i)
+
+    def _position(self, key, right=False):
+        """
+        position (block, index in the block) where key would be inserted
+        before equal keys, or after them if right
+        """
+        bisect_key = bisect.bisect_right if right else bisect.bisect_left
+        i = bisect_key(self._maxes, key)
+        if i == len(self._maxes):
+            return i, 0
+        return i, bisect_key(self._keys[i], key)
+
+    def irange(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """
+        lazily yield the keys between lo and hi in order (reverse order if reverse)
+        a missing bound is unbounded, inclusive tells whether each bound is included.
+        """
+        include_lo, include_hi = inclusive
+        start = (0, 0) if lo is None else self._position(lo, right=not include_lo)
+        stop = (len(self._keys), 0) if hi is None else self._position(hi, right=include_hi)
+        if start >= stop:
+            return
+        (start_block, start_idx), (stop_block, stop_idx) = start, stop
+        if stop_idx == 0:
+            # stop at the end of the previous block
+            stop_block -= 1
+            stop_idx = len(self._keys[stop_block])
+        blocks = range(start_block, stop_block + 1)
+        if reverse:
+            blocks = reversed(blocks)
+        for i in blocks:
+            keys = self._keys[i]
+            begin = start_idx if i == start_block else 0
+            end = stop_idx if i == stop_block else len(keys)
+            if reverse:
+                yield from reversed(keys[begin:end])
+            else:
+                yield from keys[begin:end]
+
+    def bisect_left(self, key):
+        """get the position where key would be inserted before equal keys (number of keys < key)"""
+        return self.rank(key)
+
+    def bisect_right(self, key):
+        """get the position where key would be inserted after equal keys (number of keys <= key)"""
+        i, j = self._position(key, right=True)
+        return sum(map(len, self._keys[:i])) + j
+
+    def rank(self, key):
+        """get the number of keys smaller than key"""
+        i, j = self._position(key)
+        return sum(map(len, self._keys[:i])) + j
+
+    def select(self, k):
+        """get the item with the k-th smallest key (0-based, negative counts from the end)"""
+        if k < 0:
+            k += self._len
+        if not 0 <= k < self._len:
+            raise IndexError('select index out of range')
+        for keys, values in zip(self._keys, self._values):
+            if k < len(keys):
+                return Item(keys[k], values[k])
+            k -= len(keys)
+
+    def count_range(self, lo, hi):
+        """get the number of keys with lo <= key <= hi"""
+        if hi < lo:
+            return 0
+        return self.bisect_right(hi) - self.rank(lo)
+
+
+if __name__ == '__main__':
+    """test"""
+    sbm = SortedBlockMap(load=4)
+    for key in [50, 20, 80, 10, 30, 70, 90, 25, 35, 60, 40]:
+        sbm[key] = str(key)
+    print(sbm, sbm._keys)
+    print('len', len(sbm), 'keys', list(sbm), 'reversed', list(reversed(sbm)))
+    print('search_less_near(30):', sbm.search_less_near(30), 'search_greater_near(30):', sbm.search_greater_near(30))
+    print('keys in [22, 72):', list(sbm.irange(22, 72, inclusive=(True, False))))
+    print('rank(70):', sbm.rank(70), 'select(-2):', sbm.select(-2), 'count_range(20, 50):', sbm.count_range(20, 50))
+    del sbm[30]
+    sbm.delete_min()
+    print('after deleting 30 and min', sbm._keys)
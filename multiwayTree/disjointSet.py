@@ -1,30 +1,161 @@
+import array
+import mmap
+import struct
+import sys
+
+
+"""snapshot file format"""
+SNAPSHOT_MAGIC = b'DSJ2'
+SNAPSHOT_HEADER = '<4scQQ'  # magic, byte order, number of keys, key table size
+SNAPSHOT_TYPECODE = 'q'
+# a key of the key table is its type tag followed by its bytes
+SNAPSHOT_KEY_TAGS = {int: b'i', str: b's', bytes: b'b'}
+
+
+def _encode_key(key):
+    """get the key table bytes of key, None if its type can't be in a snapshot"""
+    tag = SNAPSHOT_KEY_TAGS.get(type(key))
+    if tag is None:
+        return None
+    if tag == b'i':
+        return tag + str(key).encode('ascii')
+    if tag == b's':
+        return tag + key.encode('utf-8')
+    return tag + key
+
+
+def _decode_key(data):
+    tag, body = data[:1], data[1:]
+    if tag == b'i':
+        return int(body)
+    if tag == b's':
+        return body.decode('utf-8')
+    return body
+
 
 class Node():
-    def __init__(self, key=None):
+    def __init__(self, key=None, aggregate=None):
         self.key = key
         self.parent = self
         self.size = 1  # size of tree
+        self.aggregate = aggregate  # aggregate of the set, kept only at roots
+        self.potential = 0  # value(node) - value(parent)
 
 
 class DisjointSet():
-    def __init__(self, key_list):
+    """
+    Disjoint-set forest with union by size and path compression
+
+    combine: optional associative function merging the aggregates of two
+             roots on union, e.g. operator.add, min, max, operator.or_
+    value: optional function mapping a key to its initial aggregate,
+           defaults to the key itself
+
+    compression: path compression strategy used by find
+                 'full': point every node on the path to the root (two passes)
+                 'halving': point every other node to its grandparent
+                 'splitting': point every node to its grandparent
+                 None: no compression
+
+    Each edge also carries a relative potential (offset) so that
+    union(key1, key2, diff) records value(key2) - value(key1) == diff.
+    """
+
+    def __init__(self, key_list, combine=None, value=None, compression='full'):
         self._key2node = dict()
+        self._combine = combine
+        strategies = {
+            'full': self._find_full,
+            'halving': self._find_halving,
+            'splitting': self._find_splitting,
+            None: self._find_no_compression,
+        }
+        if compression not in strategies:
+            raise ValueError('unknown compression strategy: {}'.format(compression))
+        self.compression = compression
+        self._find_root = strategies[compression]
+        self.reset_stats()
         for key in key_list:
             if key in self._key2node:
                 continue
-            node = Node(key)
+            if combine is None:
+                aggregate = None
+            elif value is None:
+                aggregate = key
+            else:
+                aggregate = value(key)
+            node = Node(key, aggregate)
             self._key2node[key] = node
 
-    def union(self, key1, key2):
-        """ merge the two sets containing key1 and key2 """
+    def union(self, key1, key2, diff=None):
+        """
+        merge the two sets containing key1 and key2
+        if diff is given, record value(key2) - value(key1) == diff,
+        raising ValueError if it contradicts the recorded potentials
+        """
         node1 = self._key2node[key1]
         node2 = self._key2node[key2]
-        self.merge_root(node1, node2)
+        self.merge_root(node1, node2, diff=diff)
+
+    def aggregate(self, key):
+        """ returns the aggregate of the set containing key """
+        root = self.find(self._key2node[key])
+        return root.aggregate
+
+    def set_size(self, key):
+        """ returns the number of keys in the set containing key """
+        root = self.find(self._key2node[key])
+        return root.size
+
+    def potential_diff(self, key1, key2):
+        """
+        returns value(key2) - value(key1) recorded by union
+        raises ValueError if the keys are in different sets
+        """
+        root1, potential1 = self._find_with_potential(self._key2node[key1])
+        root2, potential2 = self._find_with_potential(self._key2node[key2])
+        if root1 != root2:
+            raise ValueError('{} and {} are not connected'.format(key1, key2))
+        return potential2 - potential1
 
     def find(self, node):
         """find the root node from the input node"""
-        root, _ = self._get_upward_path(node)
-        return root
+        return self._find_root(node)
+
+    def _find_with_potential(self, node):
+        """find the root node and the potential of node relative to it"""
+        root = self._find_root(node)
+        potential = 0
+        while node is not root:
+            potential += node.potential
+            node = node.parent
+        return root, potential
+
+    def stats(self):
+        """
+        returns counters accumulated by find since the last reset_stats
+        path lengths count the edges from the queried node to its root,
+        compression_updates counts rewritten parent pointers
+        """
+        if self._find_count == 0:
+            mean_path_length = 0.0
+        else:
+            mean_path_length = self._path_length_total / self._find_count
+        return {
+            'compression': self.compression,
+            'find_count': self._find_count,
+            'path_length_total': self._path_length_total,
+            'path_length_max': self._path_length_max,
+            'mean_path_length': mean_path_length,
+            'compression_updates': self._compression_updates,
+        }
+
+    def reset_stats(self):
+        """ reset the find counters """
+        self._find_count = 0
+        self._path_length_total = 0
+        self._path_length_max = 0
+        self._compression_updates = 0
 
     def is_connected(self, key1, key2):
         """ returns whether two keys are in the same set or not """
@@ -34,61 +165,296 @@ class DisjointSet():
 
     def is_connected_nodes(self, node1, node2):
         """ returns whether two nodes are in the same set or not """
-        root1, upward_path1 = self._get_upward_path(node1)
-        self._change_parent(root1, upward_path1)
+        root1 = self._find_root(node1)
+        root2 = self._find_root(node2)
+        return root1 is root2
 
-        root2, upward_path2 = self._get_upward_path(node2)
-        self._change_parent(root2, upward_path2)
+    def merge_root(self, node1, node2, diff=None):
+        """
+        Merge the sets containing node1 and node2
+        attaching the smaller sized set's root to the larger
+        """
+        # path compression first, so potentials are relative to the roots
+        root1, potential1 = self._find_with_potential(node1)
+        root2, potential2 = self._find_with_potential(node2)
 
         if root1 == root2:
-            return True
+            if diff is not None and potential2 - potential1 != diff:
+                error_message = 'inconsistent potential {} between {} and {}'
+                raise ValueError(error_message.format(diff, node1.key, node2.key))
+            return
+
+        # value(root2) - value(root1)
+        if diff is None:
+            root_diff = 0
         else:
-            return False
+            root_diff = diff - potential2 + potential1
 
-    def merge_root(self, node1, node2):
+        new_size = root1.size + root2.size
+        if self._combine is None:
+            new_aggregate = None
+        else:
+            new_aggregate = self._combine(root1.aggregate, root2.aggregate)
+        if root1.size >= root2.size:
+            root, child = root1, root2
+            child.potential = root_diff
+        else:
+            root, child = root2, root1
+            child.potential = -root_diff
+        root.size = new_size
+        root.aggregate = new_aggregate
+        child.size = None
+        child.aggregate = None
+        child.parent = root
+
+    def _record_find(self, path_length, updates):
+        """helper function to update the find counters"""
+        self._find_count += 1
+        self._path_length_total += path_length
+        if path_length > self._path_length_max:
+            self._path_length_max = path_length
+        self._compression_updates += updates
+
+    def _find_full(self, node):
         """
-        Merge the sets containing node1 and node2
-        attaching the smaller sized set's root to the larger
+        full path compression without a temporary list
+        the first pass finds the root and the potential of node relative to it,
+        the second pass points every node to the root, peeling off potentials
         """
+        root = node
+        potential = 0
+        path_length = 0
+        while root.parent is not root:
+            potential += root.potential
+            root = root.parent
+            path_length += 1
 
-        root1, upward_path1 = self._get_upward_path(node1)
-        root2, upward_path2 = self._get_upward_path(node2)
+        updates = 0
+        while node.parent is not root:
+            parent = node.parent
+            old_potential = node.potential
+            node.parent = root
+            node.potential = potential
+            potential -= old_potential
+            node = parent
+            updates += 1
+        self._record_find(path_length, updates)
+        return root
 
-        if root1 != root2:
-            new_size = root1.size + root2.size
-            if root1.size >= root2.size:
-                root = root1
-                root.size = new_size
-                root2.size = None
-                root2.parent = root
+    def _find_halving(self, node):
+        """path halving: every other node on the path skips to its grandparent"""
+        path_length = 0
+        updates = 0
+        parent = node.parent
+        while parent is not node:
+            grandparent = parent.parent
+            if grandparent is parent:
+                path_length += 1
+                node = parent
+                break
+            node.potential += parent.potential
+            node.parent = grandparent
+            updates += 1
+            path_length += 2
+            node = grandparent
+            parent = node.parent
+        self._record_find(path_length, updates)
+        return node
+
+    def _find_splitting(self, node):
+        """path splitting: every node on the path skips to its grandparent"""
+        path_length = 0
+        updates = 0
+        parent = node.parent
+        while parent is not node:
+            grandparent = parent.parent
+            if grandparent is not parent:
+                node.potential += parent.potential
+                node.parent = grandparent
+                updates += 1
+            path_length += 1
+            node = parent
+            parent = grandparent
+        self._record_find(path_length, updates)
+        return node
+
+    def _find_no_compression(self, node):
+        """walk up to the root without changing the tree"""
+        path_length = 0
+        parent = node.parent
+        while parent is not node:
+            node = parent
+            parent = node.parent
+            path_length += 1
+        self._record_find(path_length, 0)
+        return node
+
+    def save(self, path):
+        """
+        write a compact binary snapshot readable by DisjointSetSnapshot
+        layout: header, root index array, set size array, key table
+        aggregates and potentials are not stored
+
+        keys must be int, str or bytes (exactly, so no bool), raises ValueError
+        otherwise. if the keys are 0..n-1 in order, they are the indices and
+        the key table is empty. else the key table holds the offsets of the
+        encoded keys, the encoded keys, and the indices sorted by encoded key,
+        which the reader bisects in place.
+        """
+        keys = list(self._key2node)
+        key2index = {key: idx for idx, key in enumerate(keys)}
+        roots = array.array(SNAPSHOT_TYPECODE)
+        sizes = array.array(SNAPSHOT_TYPECODE)
+        for key in keys:
+            root = self.find(self._key2node[key])
+            roots.append(key2index[root.key])
+            if root.key == key:
+                sizes.append(root.size)
             else:
-                root = root2
-                root.size = new_size
-                root1.size = None
-                root1.parent = root
+                sizes.append(0)
+
+        if all(type(key) is int for key in keys) and keys == list(range(len(keys))):
+            key_table = b''  # keys are the indices themselves (0.0 == 0 is not enough)
         else:
-            root = root1
-
-        # path compression
-        self._change_parent(root, upward_path1)
-        self._change_parent(root, upward_path2)
-
-    def _get_upward_path(self, node):
-        """get root node and the path to the root from the input node"""
-        upward_path = []
-        while True:
-            p = node.parent
-            if p == node:
-                break
-            upward_path.append(node)
-            node = p
-        root = node
-        return root, upward_path
+            key_table = self._key_table(keys)
+
+        byteorder = sys.byteorder.encode()[:1]
+        header = struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC, byteorder,
+                             len(keys), len(key_table))
+        with open(path, 'wb') as f:
+            f.write(header)
+            roots.tofile(f)
+            sizes.tofile(f)
+            f.write(key_table)
 
-    def _change_parent(self, new_root, upward_path):
-        """helper function to change parent of all nodes in a list"""
-        for node in upward_path:
-            node.parent = new_root
+    def _key_table(self, keys):
+        """offsets (n + 1), indices sorted by encoded key (n), encoded keys"""
+        encoded = []
+        for key in keys:
+            data = _encode_key(key)
+            if data is None:
+                raise ValueError('snapshot keys must be int, str or bytes, got {!r}'.format(key))
+            encoded.append(data)
+        offsets = array.array(SNAPSHOT_TYPECODE, [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        order = array.array(SNAPSHOT_TYPECODE, sorted(range(len(keys)), key=encoded.__getitem__))
+        return offsets.tobytes() + order.tobytes() + b''.join(encoded)
+
+
+class DisjointSetSnapshot():
+    """
+    read-only view of a partition written by DisjointSet.save
+    root and size arrays and the key table are memory-mapped, so no Node
+    objects or key dicts are built. a key is looked up by bisecting the
+    sorted indices of the key table in O(log n) time
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_size = struct.calcsize(SNAPSHOT_HEADER)
+        magic, byteorder, num_keys, key_table_size = struct.unpack(
+            SNAPSHOT_HEADER, self._mmap[:header_size])
+        if magic != SNAPSHOT_MAGIC:
+            self._mmap.close()
+            raise ValueError('not a DisjointSet snapshot: {}'.format(path))
+        if byteorder != sys.byteorder.encode()[:1]:
+            self._mmap.close()
+            raise ValueError('snapshot byte order does not match this machine')
+
+        item_size = array.array(SNAPSHOT_TYPECODE).itemsize
+        array_size = num_keys * item_size
+        view = memoryview(self._mmap)
+        roots_end = header_size + array_size
+        sizes_end = roots_end + array_size
+        self._view = view
+        self._roots = view[header_size:roots_end].cast(SNAPSHOT_TYPECODE)
+        self._sizes = view[roots_end:sizes_end].cast(SNAPSHOT_TYPECODE)
+        self._len = num_keys
+
+        if key_table_size == 0:
+            self._offsets = None
+            self._order = None
+            self._key_data = None
+        else:
+            offsets_end = sizes_end + array_size + item_size
+            order_end = offsets_end + array_size
+            self._offsets = view[sizes_end:offsets_end].cast(SNAPSHOT_TYPECODE)
+            self._order = view[offsets_end:order_end].cast(SNAPSHOT_TYPECODE)
+            self._key_data = view[order_end:sizes_end + key_table_size]
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def _encoded_key(self, idx):
+        return bytes(self._key_data[self._offsets[idx]:self._offsets[idx + 1]])
+
+    def _lookup(self, key):
+        """get the index of key, None if there is no such key"""
+        if self._order is None:
+            # the same test as DisjointSet.save
+            if type(key) is int and 0 <= key < self._len:
+                return key
+            return None
+        data = _encode_key(key)
+        if data is None:
+            return None
+        order = self._order
+        lo, hi = 0, self._len
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._encoded_key(order[mid]) < data:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._len and self._encoded_key(order[lo]) == data:
+            return order[lo]
+        return None
+
+    def _index(self, key):
+        idx = self._lookup(key)
+        if idx is None:
+            raise KeyError(key)
+        return idx
+
+    def find(self, key):
+        """ returns the key of the root of the set containing key """
+        root_idx = self._roots[self._index(key)]
+        if self._order is None:
+            return root_idx
+        return _decode_key(self._encoded_key(root_idx))
+
+    def is_connected(self, key1, key2):
+        """ returns whether two keys are in the same set or not """
+        return self._roots[self._index(key1)] == self._roots[self._index(key2)]
+
+    def set_size(self, key):
+        """ returns the number of keys in the set containing key """
+        return self._sizes[self._roots[self._index(key)]]
+
+    def close(self):
+        """ release the memory map """
+        if self._mmap is None:
+            return
+        self._roots.release()
+        self._sizes.release()
+        if self._order is not None:
+            self._offsets.release()
+            self._order.release()
+            self._key_data.release()
+        self._view.release()
+        self._mmap.close()
+        self._mmap = None
 
 
 if __name__ == '__main__':
@@ -102,3 +468,23 @@ if __name__ == '__main__':
 
     answer = graph.is_connected(7, 9)
     print('Connected?', answer)
+    print('find stats:', graph.stats())
+
+    # per-set aggregates and relative potentials
+    import operator
+    weights = {'a': 3, 'b': 5, 'c': 7, 'd': 11}
+    graph = DisjointSet(weights, combine=operator.add, value=weights.get)
+    graph.union('a', 'b', diff=2)
+    graph.union('b', 'c', diff=-4)
+    print('sum of {a, b, c}:', graph.aggregate('a'))
+    print('size of {a, b, c}:', graph.set_size('c'))
+    print('value(c) - value(a):', graph.potential_diff('a', 'c'))
+
+    # offline partition served from a memory-mapped snapshot
+    import os
+    import tempfile
+    snapshot_path = os.path.join(tempfile.mkdtemp(), 'partition.dsj')
+    graph.save(snapshot_path)
+    with DisjointSetSnapshot(snapshot_path) as snapshot:
+        print('snapshot connected a, c?', snapshot.is_connected('a', 'c'))
+        print('snapshot connected a, d?', snapshot.is_connected('a', 'd'))
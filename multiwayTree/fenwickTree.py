@@ -1,21 +1,88 @@
-import collections
+import array
+import collections.abc
+import heapq
+import itertools
+import math
+import operator
+
+
+"""identities and inverses of the built-in operators"""
+IDENTITIES = {
+    operator.add: 0,
+    operator.mul: 1,
+    operator.xor: 0,
+    operator.or_: 0,
+    operator.and_: -1,
+    min: math.inf,
+    max: -math.inf,
+}
+INVERSES = {
+    operator.add: operator.sub,
+    operator.xor: operator.xor,
+}
 
 
 class FenwickTree(collections.abc.MutableSequence):
-    """list implementation with prefix sum"""
+    """
+    list implementation with prefix sum
 
-    def __init__(self, iterable=[]):
-        self.elements = lst = []
-        for value in iterable:
-            lst.append(value)
-        self._fenwick_tree = [0]
+    typecode: optional array module typecode such as 'q' (int64) or 'd' (float64)
+              to keep elements and tree nodes in typed arrays instead of lists
+              of boxed numbers. typed arrays support the buffer protocol, so
+              numpy.frombuffer can view them without copying.
+    combine: optional associative and commutative function replacing +,
+             e.g. operator.xor, min, max or product modulo p.
+             without combine (or with operator.add) the inline + and - are used.
+    inverse: optional function such that combine(inverse(a, b), b) == a,
+             e.g. operator.xor for xor. known for the built-in operators.
+             without an inverse, __setitem__ recomputes the O(log n) affected
+             nodes from their children in O(log^2 n) time, unless the new value
+             absorbs the old one (e.g. a larger value under max).
+    identity: identity element of combine, known for the built-in operators
+    """
+
+    def __init__(self, iterable=[], typecode=None, combine=None, inverse=None, identity=None):
+        if combine is operator.add and inverse in (None, operator.sub):
+            combine = None  # built-in fast path
+        if combine is None:
+            if inverse is not None:
+                raise ValueError('inverse requires combine')
+            identity = 0
+        else:
+            if inverse is None:
+                inverse = INVERSES.get(combine)
+            if identity is None:
+                if combine not in IDENTITIES:
+                    raise ValueError('identity is required for a custom combine')
+                identity = IDENTITIES[combine]
+                if typecode is not None:
+                    try:
+                        array.array(typecode, [identity])
+                    except (TypeError, OverflowError):
+                        # e.g. math.inf of min in an integer array
+                        raise ValueError('typecode {} cannot hold the default identity {} of {}, '
+                                         'pass an explicit identity'.format(repr(typecode), identity,
+                                                                            combine.__name__))
+        self._combine = combine
+        self._inverse = inverse
+        self._identity = identity
+
+        self.typecode = typecode
+        if typecode is None:
+            self.elements = list(iterable)
+            self._fenwick_tree = [identity]
+        else:
+            self.elements = array.array(typecode, iterable)
+            self._fenwick_tree = array.array(typecode, [identity])
         self._fill_tree_from(1)
 
     def __repr__(self):
-        return 'FenwickTree({})'.format(repr(self.elements))
+        if self.typecode is None:
+            return 'FenwickTree({})'.format(repr(self.elements))
+        return 'FenwickTree({}, typecode={})'.format(list(self.elements), repr(self.typecode))
 
     def __str__(self):
-        return 'FenwickTree({})'.format(str(self.elements))
+        return 'FenwickTree({})'.format(str(list(self.elements)))
 
     def __iter__(self):
         return iter(self.elements)
@@ -24,6 +91,7 @@ class FenwickTree(collections.abc.MutableSequence):
         return len(self.elements)
 
     def __delitem__(self, index):
+        index = self._list_index(index)
         self.elements.__delitem__(index)
         tree_idx = index + 1
         self._fill_tree_from(tree_idx)
@@ -32,20 +100,50 @@ class FenwickTree(collections.abc.MutableSequence):
         self.__delitem__(index)
 
     def insert(self, index, value):
+        if index < 0:
+            index = max(index + len(self.elements), 0)
+        index = min(index, len(self.elements))
         self.elements.insert(index, value)
         tree_idx = index + 1
         self._fill_tree_from(tree_idx)
 
     def __setitem__(self, index, value):
+        index = self._list_index(index)
         old_value = self.elements.__getitem__(index)
         self.elements.__setitem__(index, value)
-        diff = value - old_value
-        if diff == 0:
-            return
         tree_idx = index + 1
-        affected = self._affected_indices(tree_idx)
-        for idx in affected:
-            self._fenwick_tree[idx] += diff
+        combine = self._combine
+        if combine is None:
+            diff = value - old_value
+            if diff == 0:
+                return
+            _tree_add(self._fenwick_tree, tree_idx, diff)
+            return
+
+        tree = self._fenwick_tree
+        max_idx = len(self.elements)
+        inverse = self._inverse
+        if inverse is not None:
+            while tree_idx <= max_idx:
+                tree[tree_idx] = combine(inverse(tree[tree_idx], old_value), value)
+                tree_idx += tree_idx & -tree_idx
+        elif combine(old_value, value) == value:
+            # the new value absorbs the old one, e.g. increasing under max
+            while tree_idx <= max_idx:
+                tree[tree_idx] = combine(tree[tree_idx], value)
+                tree_idx += tree_idx & -tree_idx
+        else:
+            # recompute each affected node from its element and its children
+            elements = self.elements
+            while tree_idx <= max_idx:
+                lsb = tree_idx & -tree_idx
+                node_value = elements[tree_idx - 1]
+                child_lsb = 1
+                while child_lsb < lsb:
+                    node_value = combine(tree[tree_idx - child_lsb], node_value)
+                    child_lsb <<= 1
+                tree[tree_idx] = node_value
+                tree_idx += lsb
 
     def __getitem__(self, index):
         return self.elements.__getitem__(index)
@@ -54,15 +152,175 @@ class FenwickTree(collections.abc.MutableSequence):
         self.insert(len(self), value)
 
     def prefix_sum(self, list_idx):
-        """get sum of elements upto list_idx"""
-        tree_idx = list_idx + 1
-        node_value = self._fenwick_tree[tree_idx]
-        parent_idx = self._parent_index(tree_idx)
-        if parent_idx == 0:
-            parent_sum = 0
+        """get sum (or combine) of elements upto list_idx"""
+        if list_idx >= len(self.elements):
+            raise IndexError('index out of range')
+        if self._combine is None:
+            return _tree_sum(self._fenwick_tree, list_idx + 1)
+        return self._tree_fold(list_idx + 1)
+
+    def _tree_fold(self, tree_idx):
+        """combine the nodes from tree_idx to the root"""
+        tree = self._fenwick_tree
+        combine = self._combine
+        total = self._identity
+        while tree_idx > 0:
+            total = combine(tree[tree_idx], total)
+            tree_idx -= tree_idx & -tree_idx
+        return total
+
+    def update_many(self, indices, deltas):
+        """
+        add deltas[i] to (or combine it into) the element at indices[i] for every i
+        updates are coalesced per tree node: each node is visited once,
+        in increasing order, with the sum of all deltas reaching it.
+        when the batch touches most of the tree, the deltas are pushed
+        through the whole tree in a single O(n) pass instead.
+        """
+        combine = self._combine
+        elements = self.elements
+        pending = dict()
+        for index, delta in zip(indices, deltas):
+            tree_idx = self._list_index(index) + 1
+            if tree_idx not in pending:
+                pending[tree_idx] = delta
+            elif combine is None:
+                pending[tree_idx] += delta
+            else:
+                pending[tree_idx] = combine(pending[tree_idx], delta)
+        for tree_idx, delta in pending.items():
+            if combine is None:
+                elements[tree_idx - 1] += delta
+            else:
+                elements[tree_idx - 1] = combine(elements[tree_idx - 1], delta)
+
+        max_idx = len(elements)
+        dense = len(pending) * max_idx.bit_length() >= max_idx
+        if combine is None:
+            self._push_sums(pending, dense)
         else:
-            parent_sum = self.prefix_sum(parent_idx - 1)
-        return node_value + parent_sum
+            self._push_combined(pending, dense)
+
+    def _push_sums(self, pending, dense):
+        """add the pending deltas of tree nodes to the nodes covering them"""
+        tree = self._fenwick_tree
+        max_idx = len(self.elements)
+        if dense:
+            carry = [0] * (max_idx + 1)
+            for tree_idx, delta in pending.items():
+                carry[tree_idx] = delta
+            for tree_idx in range(1, max_idx + 1):
+                delta = carry[tree_idx]
+                if delta:
+                    tree[tree_idx] += delta
+                    next_idx = tree_idx + (tree_idx & -tree_idx)
+                    if next_idx <= max_idx:
+                        carry[next_idx] += delta
+            return
+
+        heap = list(pending)
+        heapq.heapify(heap)
+        while heap:
+            tree_idx = heapq.heappop(heap)
+            delta = pending.pop(tree_idx)
+            tree[tree_idx] += delta
+            next_idx = tree_idx + (tree_idx & -tree_idx)
+            if next_idx <= max_idx:
+                if next_idx in pending:
+                    pending[next_idx] += delta
+                else:
+                    pending[next_idx] = delta
+                    heapq.heappush(heap, next_idx)
+
+    def _push_combined(self, pending, dense):
+        """combine the pending deltas of tree nodes into the nodes covering them"""
+        tree = self._fenwick_tree
+        combine = self._combine
+        max_idx = len(self.elements)
+        if dense:
+            carry = [None] * (max_idx + 1)
+            for tree_idx, delta in pending.items():
+                carry[tree_idx] = delta
+            for tree_idx in range(1, max_idx + 1):
+                delta = carry[tree_idx]
+                if delta is not None:
+                    tree[tree_idx] = combine(tree[tree_idx], delta)
+                    next_idx = tree_idx + (tree_idx & -tree_idx)
+                    if next_idx <= max_idx:
+                        if carry[next_idx] is None:
+                            carry[next_idx] = delta
+                        else:
+                            carry[next_idx] = combine(carry[next_idx], delta)
+            return
+
+        heap = list(pending)
+        heapq.heapify(heap)
+        while heap:
+            tree_idx = heapq.heappop(heap)
+            delta = pending.pop(tree_idx)
+            tree[tree_idx] = combine(tree[tree_idx], delta)
+            next_idx = tree_idx + (tree_idx & -tree_idx)
+            if next_idx <= max_idx:
+                if next_idx in pending:
+                    pending[next_idx] = combine(pending[next_idx], delta)
+                else:
+                    pending[next_idx] = delta
+                    heapq.heappush(heap, next_idx)
+
+    def prefix_sum_many(self, indices):
+        """
+        get the list of prefix sums upto each of indices
+        large batches are answered from a single O(n) running sum
+        """
+        indices = [self._list_index(index) for index in indices]
+        max_idx = len(self.elements)
+        if len(indices) * max_idx.bit_length() >= max_idx:
+            if self._combine is None:
+                sums = list(itertools.accumulate(self.elements))
+            else:
+                sums = list(itertools.accumulate(self.elements, self._combine))
+            return [sums[index] for index in indices]
+        if self._combine is None:
+            tree = self._fenwick_tree
+            return [_tree_sum(tree, index + 1) for index in indices]
+        return [self._tree_fold(index + 1) for index in indices]
+
+    def find_by_prefix_sum(self, target):
+        """
+        get the smallest index whose prefix sum reaches target (>= target),
+        or len(self) if no prefix sum does, like bisect_left over the prefix sums
+        prefix sums must be non-decreasing (e.g. non-negative elements,
+        or max as combine), runs in O(log n) time
+        """
+        if self._combine is None:
+            tree_idx, _ = _tree_search(self._fenwick_tree, target, strict=True)
+            # tree_idx elements sum to less than target, so the answer is the next one
+            return tree_idx
+
+        tree = self._fenwick_tree
+        combine = self._combine
+        max_idx = len(tree) - 1
+        tree_idx = 0
+        total = self._identity
+        step = 1 << max_idx.bit_length()
+        while step:
+            next_idx = tree_idx + step
+            if next_idx <= max_idx:
+                next_total = combine(total, tree[next_idx])
+                if next_total < target:
+                    tree_idx = next_idx
+                    total = next_total
+            step >>= 1
+        return tree_idx
+
+    def _list_index(self, index):
+        """normalize a negative index and check the range"""
+        length = len(self.elements)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('index out of range')
+        return index
 
     def _parent_index(self, tree_idx):
         """get the parent's index in tree"""
@@ -151,42 +409,321 @@ class FenwickTree(collections.abc.MutableSequence):
         return output
 
     def _fill_tree_from(self, tree_idx):
-        sum_start = tree_idx - 1
-        sums = self._summation_from(sum_start)
-        for idx in range(tree_idx, len(self.elements) + 1):
-            sum_value = sums[idx - 1 - sum_start]
-            parent_idx = self._parent_index(idx)
-            if parent_idx == 0:
-                parent_sum = 0
-            elif parent_idx < tree_idx:
-                list_idx = parent_idx - 1
-                parent_sum = self.prefix_sum(list_idx)
-            else:
-                list_idx = parent_idx - 1
-                parent_sum = sums[list_idx - sum_start]
-            node_value = sum_value - parent_sum
-            if len(self._fenwick_tree) == idx:
-                self._fenwick_tree.append(node_value)
-            else:
-                self._fenwick_tree[idx] = node_value
-        tree_len = len(self._fenwick_tree)
-        target_len = len(self.elements) + 1
-        if tree_len > target_len:
-            num_delete = tree_len - target_len
-            if num_delete <= tree_len:
-                for _ in range(num_delete):
-                    self._fenwick_tree.pop()
-            else:
-                self._fenwick_tree = self._fenwick_tree[:target_len]
+        """
+        rebuild tree nodes from tree_idx to the end in O(n - tree_idx + log n)
+        nodes below tree_idx only cover unchanged elements and are kept as is
+        """
+        tree = self._fenwick_tree
+        max_idx = len(self.elements)
+        del tree[tree_idx:]
+        tree.extend(self.elements[tree_idx - 1:])
+
+        # nodes below tree_idx which are covered by a node from tree_idx on
+        child_idx = tree_idx - 1
+        while child_idx > 0:
+            next_idx = child_idx + (child_idx & -child_idx)
+            if next_idx <= max_idx:
+                if self._combine is None:
+                    tree[next_idx] += tree[child_idx]
+                else:
+                    tree[next_idx] = self._combine(tree[next_idx], tree[child_idx])
+            child_idx = self._parent_index(child_idx)
+
+        # push each node into the next node covering it, in increasing order
+        combine = self._combine
+        for idx in range(tree_idx, max_idx + 1):
+            next_idx = idx + (idx & -idx)
+            if next_idx <= max_idx:
+                if combine is None:
+                    tree[next_idx] += tree[idx]
+                else:
+                    tree[next_idx] = combine(tree[next_idx], tree[idx])
 
-    def _summation_from(self, list_idx):
-        """helper function to make batch update"""
-        if list_idx == 0:
-            summation = 0
+
+def _build_tree(values):
+    """build a 1-based fenwick tree in O(n) by adding each node into the next covering node"""
+    tree = [0]
+    tree.extend(values)
+    max_idx = len(values)
+    for tree_idx in range(1, max_idx + 1):
+        next_idx = tree_idx + (tree_idx & -tree_idx)
+        if next_idx <= max_idx:
+            tree[next_idx] += tree[tree_idx]
+    return tree
+
+
+def _tree_add(tree, tree_idx, delta):
+    """add delta to the node and all nodes covering it"""
+    max_idx = len(tree) - 1
+    while tree_idx <= max_idx:
+        tree[tree_idx] += delta
+        tree_idx += tree_idx & -tree_idx
+
+
+def _tree_sum(tree, tree_idx):
+    """sum of the nodes from tree_idx to the root"""
+    total = 0
+    while tree_idx > 0:
+        total += tree[tree_idx]
+        tree_idx -= tree_idx & -tree_idx
+    return total
+
+
+def _tree_search(tree, target, strict=False):
+    """
+    largest tree_idx whose prefix sum is not greater than target
+    (less than target if strict), by binary lifting
+    returns the index and target minus its prefix sum
+    assumes non-negative elements, runs in O(log n) time
+    """
+    max_idx = len(tree) - 1
+    tree_idx = 0
+    step = 1 << max_idx.bit_length()
+    while step:
+        next_idx = tree_idx + step
+        if next_idx <= max_idx:
+            node_value = tree[next_idx]
+            if node_value < target or (node_value == target and not strict):
+                tree_idx = next_idx
+                target -= node_value
+        step >>= 1
+    return tree_idx, target
+
+
+class BlockedFenwickTree(collections.abc.MutableSequence):
+    """
+    list implementation with prefix sum and cheap insert / delete
+
+    elements are kept in blocks of at most 2 * block_size items, and two
+    fenwick trees hold the length and the sum of each block.
+    locating an index and the block part of a prefix sum take O(log n) time,
+    the rest is an O(block_size) list operation inside a single block.
+    a block is split when it grows beyond 2 * block_size items, and merged
+    into a neighbor when it shrinks below block_size / 2 items. either one
+    rebuilds the block trees from the kept block lengths and block sums in
+    O(n / block_size) time, which is amortized over the O(block_size)
+    insertions or deletions between two splits or merges.
+    """
+
+    def __init__(self, iterable=[], block_size=512):
+        if block_size < 1:
+            raise ValueError('block_size must be positive')
+        self.block_size = block_size
+        values = list(iterable)
+        self._blocks = [values[i:i + block_size] for i in range(0, len(values), block_size)]
+        self._block_sums = [sum(block) for block in self._blocks]
+        self._len = len(values)
+        self._rebuild_block_trees()
+
+    def __repr__(self):
+        return 'BlockedFenwickTree({})'.format(repr(list(self)))
+
+    def __iter__(self):
+        for block in self._blocks:
+            for value in block:
+                yield value
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index):
+        block_idx, offset = self._locate(index)
+        return self._blocks[block_idx][offset]
+
+    def __setitem__(self, index, value):
+        block_idx, offset = self._locate(index)
+        block = self._blocks[block_idx]
+        diff = value - block[offset]
+        block[offset] = value
+        if diff != 0:
+            self._block_sums[block_idx] += diff
+            _tree_add(self._sum_tree, block_idx + 1, diff)
+
+    def __delitem__(self, index):
+        block_idx, offset = self._locate(index)
+        block = self._blocks[block_idx]
+        value = block.pop(offset)
+        self._len -= 1
+        self._block_sums[block_idx] -= value
+        if not block:
+            del self._blocks[block_idx]
+            del self._block_sums[block_idx]
+            self._rebuild_block_trees()
+        elif len(block) < self.block_size // 2 and len(self._blocks) > 1:
+            self._merge_block(block_idx)
+        else:
+            _tree_add(self._len_tree, block_idx + 1, -1)
+            _tree_add(self._sum_tree, block_idx + 1, -value)
+
+    def delete(self, index):
+        self.__delitem__(index)
+
+    def insert(self, index, value):
+        """insert value before index, clamping the index like list.insert"""
+        if index < 0:
+            index = max(index + self._len, 0)
+        index = min(index, self._len)
+        if not self._blocks:
+            self._blocks.append([value])
+            self._block_sums.append(value)
+            self._len += 1
+            self._rebuild_block_trees()
+            return
+        if index == self._len:
+            block_idx = len(self._blocks) - 1
+            offset = len(self._blocks[block_idx])
         else:
-            summation = self.prefix_sum(list_idx - 1)
-        sums = []
-        for idx in range(list_idx, len(self.elements)):
-            summation += self.elements[idx]
-            sums.append(summation)
-        return sums
\ No newline at end of file
+            block_idx, offset = self._locate(index)
+        block = self._blocks[block_idx]
+        block.insert(offset, value)
+        self._len += 1
+        self._block_sums[block_idx] += value
+        if len(block) > 2 * self.block_size:
+            self._split_block(block_idx)
+            self._rebuild_block_trees()
+        else:
+            _tree_add(self._len_tree, block_idx + 1, 1)
+            _tree_add(self._sum_tree, block_idx + 1, value)
+
+    def prefix_sum(self, list_idx):
+        """get sum of elements upto list_idx"""
+        block_idx, offset = self._locate(list_idx)
+        return _tree_sum(self._sum_tree, block_idx) + sum(self._blocks[block_idx][:offset + 1])
+
+    def _locate(self, index):
+        """get the block index and the offset in the block of a list index"""
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('index out of range')
+        return _tree_search(self._len_tree, index)
+
+    def _split_block(self, block_idx):
+        """split a block in half, the sum of the smaller half is computed in O(block_size)"""
+        block = self._blocks[block_idx]
+        half = len(block) // 2
+        right_sum = sum(block[half:])
+        self._blocks[block_idx:block_idx + 1] = [block[:half], block[half:]]
+        total = self._block_sums[block_idx]
+        self._block_sums[block_idx:block_idx + 1] = [total - right_sum, right_sum]
+
+    def _merge_block(self, block_idx):
+        """merge a small block into its neighbor, splitting the result again if it's too large"""
+        if block_idx == len(self._blocks) - 1:
+            block_idx -= 1
+        self._blocks[block_idx:block_idx + 2] = [self._blocks[block_idx] + self._blocks[block_idx + 1]]
+        self._block_sums[block_idx:block_idx + 2] = [self._block_sums[block_idx] + self._block_sums[block_idx + 1]]
+        if len(self._blocks[block_idx]) > 2 * self.block_size:
+            self._split_block(block_idx)
+        self._rebuild_block_trees()
+
+    def _rebuild_block_trees(self):
+        """build the block trees from the block lengths and sums in O(number of blocks)"""
+        self._len_tree = _build_tree([len(block) for block in self._blocks])
+        self._sum_tree = _build_tree(list(self._block_sums))
+
+
+class RangeFenwickTree():
+    """
+    fixed-length sequence with range updates and range sums
+
+    keeps two fenwick trees over the difference array d (d[i] = a[i] - a[i-1]):
+    B1 stores d[i] and B2 stores d[i] * (i - 1) at 1-based index i, so that
+        sum(a[1..i]) = i * sum(B1[1..i]) - sum(B2[1..i])
+    add_range and range_sum both run in O(log n) time
+    """
+
+    def __init__(self, iterable=()):
+        values = list(iterable)
+        self._len = len(values)
+        diffs = []
+        weighted = []
+        prev = 0
+        for tree_idx, value in enumerate(values, 1):
+            diff = value - prev
+            diffs.append(diff)
+            weighted.append(diff * (tree_idx - 1))
+            prev = value
+        self._tree1 = _build_tree(diffs)
+        self._tree2 = _build_tree(weighted)
+
+    def __repr__(self):
+        return 'RangeFenwickTree({})'.format(repr(list(self)))
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        prev = 0
+        for list_idx in range(self._len):
+            current = self.prefix_sum(list_idx)
+            yield current - prev
+            prev = current
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('index out of range')
+        return self.range_sum(index, index)
+
+    def add(self, index, delta):
+        """add delta to the element at index"""
+        self.add_range(index, index, delta)
+
+    def add_range(self, start, end, delta):
+        """add delta to every element in [start, end] (both inclusive)"""
+        self._check_range(start, end)
+        left = start + 1
+        right = end + 2  # first tree index after the range
+        _tree_add(self._tree1, left, delta)
+        _tree_add(self._tree2, left, delta * start)
+        if right <= self._len:
+            _tree_add(self._tree1, right, -delta)
+            _tree_add(self._tree2, right, -delta * (end + 1))
+
+    def prefix_sum(self, list_idx):
+        """get sum of elements upto list_idx"""
+        tree_idx = list_idx + 1
+        return _tree_sum(self._tree1, tree_idx) * tree_idx - _tree_sum(self._tree2, tree_idx)
+
+    def range_sum(self, start, end):
+        """get sum of elements in [start, end] (both inclusive)"""
+        self._check_range(start, end)
+        total = self.prefix_sum(end)
+        if start > 0:
+            total -= self.prefix_sum(start - 1)
+        return total
+
+    def _check_range(self, start, end):
+        if not 0 <= start <= end < self._len:
+            raise IndexError('invalid range [{}, {}]'.format(start, end))
+
+
+if __name__ == '__main__':
+    counters = RangeFenwickTree([0] * 10)
+    counters.add_range(2, 5, 3)
+    counters.add_range(4, 9, 1)
+    print(counters)
+    print('sum of [3, 6]:', counters.range_sum(3, 6))
+
+    book = BlockedFenwickTree(range(10), block_size=4)
+    book.insert(5, 100)
+    del book[0]
+    print(book, 'prefix sum upto 5:', book.prefix_sum(5))
+
+    histogram = FenwickTree([0] * 16, typecode='q')
+    histogram.update_many([1, 3, 3, 8, 15], [2, 1, 1, 5, 7])
+    print(histogram, histogram.prefix_sum_many([0, 3, 8, 15]))
+    print('median bucket:', histogram.find_by_prefix_sum(histogram.prefix_sum(15) / 2))
+
+    peaks = FenwickTree([3, 1, 4, 1, 5, 9, 2, 6], combine=max)
+    print('running max upto 3:', peaks.prefix_sum(3))
+    peaks[2] = 0  # non-monotone update without an inverse
+    print('running max upto 3:', peaks.prefix_sum(3))
+
+    p = 1000000007
+    products = FenwickTree([2, 3, 5, 7], combine=lambda a, b: a * b % p,
+                           inverse=lambda a, b: a * pow(b, -1, p) % p, identity=1)
+    products[1] = 11
+    print('product upto 3 mod p:', products.prefix_sum(3))
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""nDimFenwickTree.py
+
+This module implements multi dimensional Fenwick tree (binary indexed tree).
+
+A d-dimensional Fenwick tree over a grid of shape (n_1, ..., n_d) applies the
+1-dimensional index arithmetic on every axis independently: a node covers the
+product of the 1-dimensional ranges of its coordinates. Point updates and
+prefix (orthogonal box) sums take O(log(n_1) * ... * log(n_d)) time.
+
+Nodes are stored in a single flat array in row-major order, with one extra
+zero slot on each axis for the 1-based indices, instead of nested lists of
+1-dimensional trees.
+
+"""
+
+import array
+import itertools
+
+
+class NDimFenwickTree():
+    def __init__(self, shape, values=None, typecode=None):
+        """
+        shape: length of each axis, e.g. (hours, regions, products)
+        values: optional flat iterable of the initial elements in row-major order
+        typecode: optional array module typecode such as 'q' or 'd' for the storage
+        """
+        self.shape = tuple(shape)
+        if not self.shape or min(self.shape) < 1:
+            raise ValueError('every axis must have a positive length')
+        self.typecode = typecode
+
+        # strides of the 1-based tree coordinates in the flat array
+        sizes = [length + 1 for length in self.shape]
+        strides = [1] * len(sizes)
+        for axis in range(len(sizes) - 2, -1, -1):
+            strides[axis] = strides[axis + 1] * sizes[axis + 1]
+        self._strides = strides
+        total = strides[0] * sizes[0]
+        if typecode is None:
+            self._tree = [0] * total
+        else:
+            self._tree = array.array(typecode, bytes(array.array(typecode).itemsize * total))
+
+        if values is not None:
+            self._build(values)
+
+    def __repr__(self):
+        return 'NDimFenwickTree(shape={})'.format(self.shape)
+
+    def __getitem__(self, point):
+        """get the element at point"""
+        return self.box_sum(point, point)
+
+    def __setitem__(self, point, value):
+        """set the element at point"""
+        self.add(point, value - self[point])
+
+    def add(self, point, delta):
+        """add delta to the element at point"""
+        self._check_point(point)
+        tree = self._tree
+        for flat_idx in self._flat_indices(point, upward=True):
+            tree[flat_idx] += delta
+
+    def prefix_sum(self, point):
+        """get sum of elements in the box from the origin upto point (inclusive)"""
+        self._check_point(point)
+        return self._prefix_sum(point)
+
+    def box_sum(self, lower, upper):
+        """get sum of elements in the box [lower, upper] (both inclusive on every axis)"""
+        self._check_point(lower)
+        self._check_point(upper)
+        for low, high in zip(lower, upper):
+            if low > high:
+                raise IndexError('invalid box {} - {}'.format(lower, upper))
+
+        # inclusion-exclusion over the 2^d corners of the box
+        total = 0
+        for picks in itertools.product((False, True), repeat=len(self.shape)):
+            corner = []
+            for pick_lower, low, high in zip(picks, lower, upper):
+                corner.append(low - 1 if pick_lower else high)
+            if min(corner) < 0:
+                continue
+            if sum(picks) % 2 == 0:
+                total += self._prefix_sum(corner)
+            else:
+                total -= self._prefix_sum(corner)
+        return total
+
+    def _prefix_sum(self, point):
+        tree = self._tree
+        total = 0
+        for flat_idx in self._flat_indices(point, upward=False):
+            total += tree[flat_idx]
+        return total
+
+    def _flat_indices(self, point, upward):
+        """
+        flat positions of the nodes covering point (upward, for updates)
+        or making up the prefix upto point (downward, for sums)
+        """
+        flat_indices = [0]
+        for coord, length, stride in zip(point, self.shape, self._strides):
+            axis_offsets = []
+            tree_idx = coord + 1
+            if upward:
+                while tree_idx <= length:
+                    axis_offsets.append(tree_idx * stride)
+                    tree_idx += tree_idx & -tree_idx
+            else:
+                while tree_idx > 0:
+                    axis_offsets.append(tree_idx * stride)
+                    tree_idx -= tree_idx & -tree_idx
+            flat_indices = [base + offset for base in flat_indices for offset in axis_offsets]
+        return flat_indices
+
+    def _check_point(self, point):
+        if len(point) != len(self.shape):
+            raise IndexError('expected {} coordinates, got {}'.format(len(self.shape), len(point)))
+        for coord, length in zip(point, self.shape):
+            if not 0 <= coord < length:
+                raise IndexError('point {} out of range'.format(point))
+
+    def _build(self, values):
+        """
+        build the tree in O(d * N) time: place the elements, then on each axis
+        add every node into the next node covering it along that axis
+        """
+        tree = self._tree
+        values = iter(values)
+        for point in itertools.product(*[range(length) for length in self.shape]):
+            flat_idx = 0
+            for coord, stride in zip(point, self._strides):
+                flat_idx += (coord + 1) * stride
+            try:
+                tree[flat_idx] = next(values)
+            except StopIteration:
+                raise ValueError('expected {} values'.format(self._num_elements()))
+        if next(values, None) is not None:
+            raise ValueError('expected {} values'.format(self._num_elements()))
+
+        # row-major order visits each axis coordinate in increasing order
+        for length, stride in zip(self.shape, self._strides):
+            size = length + 1
+            for flat_idx in range(len(tree)):
+                tree_idx = (flat_idx // stride) % size
+                if tree_idx == 0:
+                    continue
+                next_idx = tree_idx + (tree_idx & -tree_idx)
+                if next_idx <= length:
+                    tree[flat_idx + (next_idx - tree_idx) * stride] += tree[flat_idx]
+
+    def _num_elements(self):
+        num = 1
+        for length in self.shape:
+            num *= length
+        return num
+
+
+if __name__ == '__main__':
+    # (hour, region, product) sales heatmap
+    heatmap = NDimFenwickTree((24, 4, 3))
+    heatmap.add((9, 1, 0), 5)
+    heatmap.add((10, 1, 2), 3)
+    heatmap.add((18, 3, 1), 7)
+    print('morning sales in region 1:', heatmap.box_sum((6, 1, 0), (12, 1, 2)))
+    print('all sales:', heatmap.prefix_sum((23, 3, 2)))
+
+    grid = NDimFenwickTree((3, 4), values=range(12))
+    print('grid[1, 2]:', grid[1, 2])
+    print('sum of rows 1-2, columns 1-3:', grid.box_sum((1, 1), (2, 3)))
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""slidingWindowCounter.py
+
+This module implements a time-windowed counter on top of a Fenwick tree.
+
+Time is cut into buckets of `resolution` seconds, and the buckets of the last
+`window` seconds are kept in a ring buffer: bucket b lives in slot
+b % num_buckets of a fixed-length FenwickTree. When time moves forward, the
+slots of the expired buckets are reset to 0 in place and reused, so the tree
+is never rebuilt and never shifted with delete(0).
+
+- add(timestamp, amount): O(log n), plus O(log n) per expired bucket
+- sum(last_seconds): O(log n) with two or three prefix sums over the ring
+
+"""
+
+import math
+
+import fenwickTree
+
+
+class SlidingWindowCounter():
+    def __init__(self, window, resolution=1.0, typecode=None):
+        """
+        window: length of the window in seconds
+        resolution: width of a bucket in seconds
+        typecode: optional array module typecode for the bucket storage
+        """
+        if window <= 0 or resolution <= 0:
+            raise ValueError('window and resolution must be positive')
+        self.window = window
+        self.resolution = resolution
+        self.num_buckets = int(math.ceil(window / resolution))
+        self.typecode = typecode
+        self._tree = fenwickTree.FenwickTree([0] * self.num_buckets, typecode=typecode)
+        self._latest = None  # the newest bucket seen so far
+
+    def __repr__(self):
+        format_info = [self.window, self.resolution, self.total()]
+        return 'SlidingWindowCounter(window={}, resolution={}, total={})'.format(*format_info)
+
+    def add(self, timestamp, amount=1):
+        """
+        count amount at timestamp (seconds), expiring the buckets that fall out
+        of the window. returns False if timestamp is already out of the window
+        """
+        bucket = self._bucket(timestamp)
+        self._advance(bucket)
+        if bucket <= self._latest - self.num_buckets:
+            return False
+        slot = bucket % self.num_buckets
+        tree = self._tree
+        tree[slot] = tree[slot] + amount
+        return True
+
+    def sum(self, last_seconds=None, now=None):
+        """
+        get the total counted in the last_seconds up to now (both in seconds)
+        last_seconds defaults to the whole window and is rounded up to whole
+        buckets, now defaults to the latest timestamp added
+        """
+        if self._latest is None:
+            return 0
+        if now is not None:
+            self._advance(self._bucket(now))
+        if last_seconds is None:
+            num = self.num_buckets
+        else:
+            num = min(int(math.ceil(last_seconds / self.resolution)), self.num_buckets)
+        if num <= 0:
+            return 0
+
+        tree = self._tree
+        end = self._latest % self.num_buckets
+        start = (self._latest - num + 1) % self.num_buckets
+        total = tree.prefix_sum(end)
+        if start <= end:
+            if start > 0:
+                total -= tree.prefix_sum(start - 1)
+        else:
+            # the range wraps around the end of the ring
+            total += tree.prefix_sum(self.num_buckets - 1) - tree.prefix_sum(start - 1)
+        return total
+
+    def total(self):
+        """get the total counted in the whole window"""
+        return self.sum()
+
+    def _bucket(self, timestamp):
+        return int(math.floor(timestamp / self.resolution))
+
+    def _advance(self, bucket):
+        """move the newest bucket forward, resetting the slots of expired buckets"""
+        if self._latest is None:
+            self._latest = bucket
+            return
+        if bucket <= self._latest:
+            return
+        num_expired = bucket - self._latest
+        if num_expired >= self.num_buckets:
+            # the whole window expired
+            self._tree = fenwickTree.FenwickTree([0] * self.num_buckets, typecode=self.typecode)
+        else:
+            tree = self._tree
+            for expired in range(self._latest + 1, bucket + 1):
+                slot = expired % self.num_buckets
+                tree[slot] = 0
+        self._latest = bucket
+
+
+if __name__ == '__main__':
+    import random
+
+    counter = SlidingWindowCounter(window=60, resolution=1)
+    now = 1000.0
+    for _ in range(10000):
+        now += random.expovariate(100)
+        counter.add(now)
+    print(counter)
+    print('requests in the last 10s:', counter.sum(10))
+    print('requests in the last 10s, 55s later:', counter.sum(10, now=now + 55))